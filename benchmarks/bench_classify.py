@@ -0,0 +1,89 @@
+"""
+Benchmark for batch abnormal-flag classification.
+
+Builds random observations (including values exactly on the range bounds,
+inverted ranges and flags printed on the report), classifies them with the
+per-row classify_value loop and with the vectorized classify_observations,
+checks both agree, and reports rows/s for each. Columns are packed up front
+with pack_columns, as the analysis workers do before handing results to the
+batch classifier; packing is timed separately. The NumPy kernel
+(classify_flags) is also timed on its own.
+
+    python benchmarks/bench_classify.py --rows 1000000
+    python benchmarks/bench_classify.py --rows 1000000 --borderline 0.05 --critical 0.5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_project.settings')
+
+import django
+
+django.setup()
+
+import numpy as np
+
+from hospital.analysis import Observation, classify_flags, classify_observations, classify_value, pack_columns
+
+
+def random_observations(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        low = round(rng.uniform(0, 100), 1)
+        high = round(low + rng.uniform(-5, 100), 1)
+        value = rng.choice([low, high, round(rng.uniform(low - 50, high + 50), 2)])
+        flag = rng.choice([None] * 8 + ['L', 'H', 'Borderline', ''])
+        rows.append(Observation('Test', value, 'mg/dL', low, high, flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--borderline', type=float)
+    parser.add_argument('--critical', type=float)
+    args = parser.parse_args()
+
+    bands = {}
+    if args.borderline is not None:
+        bands['borderline'] = args.borderline
+    if args.critical is not None:
+        bands['critical'] = args.critical
+
+    rows = random_observations(args.rows)
+
+    start = time.perf_counter()
+    expected = [classify_value(row.value, row.low, row.high, row.flag, bands) for row in rows]
+    per_row = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = pack_columns(rows)
+    packing = time.perf_counter() - start
+
+    classify_observations(rows[:1000], bands, pack_columns(rows[:1000]))  # import NumPy outside the timed section
+    start = time.perf_counter()
+    flags = classify_observations(rows, bands, columns)
+    vectorized = time.perf_counter() - start
+
+    values, lows, highs = (np.frombuffer(column, dtype=float) for column in columns)
+    start = time.perf_counter()
+    classify_flags(values, lows, highs, bands)
+    kernel = time.perf_counter() - start
+
+    if flags != expected:
+        mismatches = sum(a != b for a, b in zip(flags, expected))
+        sys.exit(f"vectorized flags differ from the per-row logic on {mismatches} rows")
+    print(f"{args.rows} rows, bands={bands or 'none'}")
+    print(f"  per-row     {per_row:8.3f} s  {args.rows / per_row:12,.0f} rows/s")
+    print(f"  vectorized  {vectorized:8.3f} s  {args.rows / vectorized:12,.0f} rows/s  ({per_row / vectorized:.1f}x)")
+    print(f"  packing     {packing:8.3f} s  (done in the analysis workers)")
+    print(f"  kernel only {kernel:8.3f} s  {args.rows / kernel:12,.0f} rows/s  ({per_row / kernel:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Dashboard latency benchmark on a large synthetic hospital.
+
+Seeds a test database (in memory with the default SQLite settings) with about a
+million appointments spread over two years, their test requests and results,
+then times the dashboards twice on the latest schema: without the composite and
+partial indexes of migration 0011, and after building them again. For each view
+it reports the median response time and the part of it spent in SQL.
+
+    python benchmarks/bench_dashboard_queries.py
+    python benchmarks/bench_dashboard_queries.py --appointments 200000 --repeat 3
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_project.settings')
+# Every timed request has to run its queries, not read the dashboard cache
+os.environ['DASHBOARD_CACHE_URL'] = 'dummycache://'
+
+import django
+
+django.setup()
+
+from django.apps import apps
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from hospital.models import Appointment, Patient, TestRequest, TestResult, TestType, User
+
+INDEX_MIGRATION = '0011_dashboard_indexes'
+BATCH_SIZE = 10000
+
+
+def seed(appointments, doctors, patients, rng):
+    """Fill the database; returns the users whose dashboards are timed"""
+    today = datetime.date.today()
+    now = timezone.now()
+    staff = User.objects.bulk_create([
+        User(username='bench-receptionist', password='!', is_receptionist=True),
+        User(username='bench-tester', password='!', is_tester=True),
+    ])
+    doctor_ids = [u.pk for u in User.objects.bulk_create(
+        User(username=f'bench-doctor-{i}', password='!', first_name='Doctor', last_name=str(i), is_doctor=True)
+        for i in range(doctors)
+    )]
+    patient_ids = []
+    for start in range(0, patients, BATCH_SIZE):
+        users = User.objects.bulk_create(
+            User(username=f'bench-patient-{i}', password='!', first_name='Patient', last_name=str(i), is_patient=True)
+            for i in range(start, min(start + BATCH_SIZE, patients))
+        )
+        Patient.objects.bulk_create(
+            Patient(user=u, date_of_birth=datetime.date(1980, 1, 1), gender='O', address='-') for u in users
+        )
+        patient_ids += [u.pk for u in users]
+    test_types = TestType.objects.bulk_create(TestType(name=f'Test {i}', price=10) for i in range(20))
+    slots = [slot for slot, _ in Appointment.TIME_SLOTS]
+
+    for start in range(0, appointments, BATCH_SIZE):
+        batch = []
+        for _ in range(min(BATCH_SIZE, appointments - start)):
+            day = today + datetime.timedelta(days=rng.randint(-730, 30))
+            doctor_id = rng.choice(doctor_ids)
+            if day < today:
+                status = 'COM' if rng.random() < 0.85 else 'CAN'
+            elif rng.random() < 0.005:
+                status, doctor_id = 'PEN', None
+            else:
+                status = 'SCH'
+            batch.append(Appointment(
+                patient_id=rng.choice(patient_ids), doctor_id=doctor_id, date=day,
+                time_slot=rng.choice(slots), problem='-', status=status,
+            ))
+        batch = Appointment.objects.bulk_create(batch)
+
+        requests = []
+        for appointment in batch:
+            if appointment.status == 'COM' and rng.random() < 0.3:
+                status = 'COM'
+            elif appointment.status == 'SCH' and appointment.date == today and rng.random() < 0.2:
+                status = rng.choice(['PEN', 'APP'])
+            else:
+                continue
+            requests.append(TestRequest(
+                appointment=appointment, test_type=rng.choice(test_types), requested_by_id=appointment.doctor_id,
+                status=status, approved_at=now if status != 'PEN' else None,
+            ))
+        requests = TestRequest.objects.bulk_create(requests)
+        TestResult.objects.bulk_create(
+            TestResult(test_request=r, result='-', completed_at=now - datetime.timedelta(minutes=rng.randint(0, 10 ** 6)))
+            for r in requests if r.status == 'COM'
+        )
+
+    busiest = Appointment.objects.filter(date=today, status='SCH').values_list('doctor_id', flat=True).first()
+    doctor = User.objects.get(pk=busiest or doctor_ids[0])
+    patient = Patient.objects.filter(appointment__doctor=doctor, appointment__status='COM').first()
+    return {'receptionist': staff[0], 'tester': staff[1], 'doctor': doctor, 'patient': patient}
+
+
+def views_to_time(users):
+    patient = users['patient']
+    return [
+        ('receptionist_dashboard', users['receptionist'], reverse('receptionist_dashboard')),
+        ('tester_dashboard', users['tester'], reverse('tester_dashboard')),
+        ('doctor_dashboard', users['doctor'], reverse('doctor_dashboard')),
+        ('patient_dashboard', patient.user, reverse('patient_dashboard')),
+        ('patient_history', patient.user, reverse('patient_history')),
+    ]
+
+
+class SqlTimer:
+    """execute_wrapper that adds up the time spent in the database, and counts queries"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def time_views(views, repeat):
+    """{view name: (median ms, median SQL ms, queries)}"""
+    results = {}
+    for name, user, url in views:
+        client = Client()
+        client.force_login(user)
+        client.get(url)
+        totals, sql = [], []
+        for _ in range(repeat):
+            timer = SqlTimer()
+            with connection.execute_wrapper(timer):
+                start = time.perf_counter()
+                response = client.get(url)
+                totals.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                sys.exit(f'{name} answered {response.status_code}')
+            sql.append(timer.seconds * 1000)
+        results[name] = statistics.median(totals), statistics.median(sql), timer.queries
+    return results
+
+
+def set_indexes(present):
+    """Build or drop the indexes INDEX_MIGRATION adds, leaving the rest of the schema as it is"""
+    migration = MigrationLoader(connection).get_migration('hospital', INDEX_MIGRATION)
+    with connection.schema_editor() as editor:
+        for operation in migration.operations:
+            model = apps.get_model('hospital', operation.model_name)
+            if present:
+                editor.add_index(model, operation.index)
+            else:
+                editor.remove_index(model, operation.index)
+
+
+def analyze():
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--appointments', type=int, default=1000000)
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    set_indexes(False)
+
+    start = time.perf_counter()
+    users = seed(args.appointments, args.doctors, args.patients, random.Random(args.seed))
+    print(f'Seeded {Appointment.objects.count()} appointments, {TestRequest.objects.count()} test requests '
+          f'and {TestResult.objects.count()} results in {time.perf_counter() - start:.0f} s')
+    views = views_to_time(users)
+
+    analyze()
+    before = time_views(views, args.repeat)
+    start = time.perf_counter()
+    set_indexes(True)
+    analyze()
+    print(f'Built the {INDEX_MIGRATION} indexes in {time.perf_counter() - start:.1f} s')
+    after = time_views(views, args.repeat)
+
+    print(f"\n{'view':24} {'queries':>7} {'before ms':>10} {'(sql)':>9} {'after ms':>10} {'(sql)':>9} {'sql speedup':>12}")
+    for name, _, _ in views:
+        total_before, sql_before, queries = before[name]
+        total_after, sql_after, _ = after[name]
+        print(f'{name:24} {queries:7} {total_before:10.1f} {sql_before:9.1f} {total_after:10.1f} {sql_after:9.1f} '
+              f'{sql_before / sql_after:11.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Throughput and correctness benchmark for the PDF report path.
+
+Generates a synthetic corpus with benchmarks/synthetic_reports.py (or reads
+one given with --corpus) and times, over every report:
+
+  extract_text_from_pdf       pages/s
+  extract_abnormal_results    rows/s on the extracted text
+  fallback_regex_extraction   rows/s on the extracted text
+
+Peak Python memory per report is measured with tracemalloc in a separate,
+untimed pass, since tracing slows allocation-heavy code down. The abnormal
+rows found are compared with the manifest, per layout; --check exits with
+an error when any report differs.
+
+    python benchmarks/bench_pdf_parsing.py --reports 20 --pages 10
+    python benchmarks/bench_pdf_parsing.py --corpus /tmp/corpus --check
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_project.settings')
+
+import django
+
+django.setup()
+
+from synthetic_reports import add_corpus_arguments, generate_corpus
+
+from hospital.analysis import extract_abnormal_results, extract_text_from_pdf, fallback_regex_extraction
+
+
+def timed(func, args, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Directory written by synthetic_reports.py; generated in a temp dir otherwise')
+    add_corpus_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=1, help='Best of N timings per report and stage')
+    parser.add_argument('--check', action='store_true', help='Exit with an error if any report parses differently')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus or tmp
+        if args.corpus:
+            with open(os.path.join(corpus, 'manifest.json')) as f:
+                manifest = json.load(f)
+        else:
+            manifest = generate_corpus(tmp, args.reports, args.pages, args.layout, args.flag_rate, args.noise, args.seed)
+
+        extract_text_from_pdf(os.path.join(corpus, manifest[0]['file']))  # import pdfplumber outside the timings
+        stages = {'extract_text_from_pdf': [0.0, 0], 'extract_abnormal_results': [0.0, 0], 'fallback_regex_extraction': [0.0, 0]}
+        accuracy = {}
+        for entry in manifest:
+            path = os.path.join(corpus, entry['file'])
+            elapsed, text = timed(extract_text_from_pdf, (path,), args.repeat)
+            timings = {'extract_text_from_pdf': elapsed}
+            timings['extract_abnormal_results'], found = timed(extract_abnormal_results, (text,), args.repeat)
+            timings['fallback_regex_extraction'], _ = timed(fallback_regex_extraction, (text,), args.repeat)
+            peaks = {
+                'extract_text_from_pdf': peak_memory(extract_text_from_pdf, path),
+                'extract_abnormal_results': peak_memory(extract_abnormal_results, text),
+                'fallback_regex_extraction': peak_memory(fallback_regex_extraction, text),
+            }
+            for name, stage in stages.items():
+                stage[0] += timings[name]
+                stage[1] = max(stage[1], peaks[name])
+
+            expected = [(row['Test'], row['Status']) for row in entry['abnormal']]
+            actual = [(row['Test'], row['Status']) for row in found]
+            layout = accuracy.setdefault(entry['layout'], {'reports': 0, 'exact': 0, 'expected': 0, 'found': 0, 'matched': 0})
+            layout['reports'] += 1
+            layout['exact'] += actual == expected
+            layout['expected'] += len(expected)
+            layout['found'] += len(actual)
+            layout['matched'] += sum((Counter(expected) & Counter(actual)).values())
+
+    pages = sum(entry['pages'] for entry in manifest)
+    rows = sum(entry['rows'] for entry in manifest)
+    print(f"{len(manifest)} report(s), {pages} page(s), {rows} result row(s)")
+    for name, (elapsed, peak) in stages.items():
+        rate = f"{pages / elapsed:10,.1f} pages/s" if name == 'extract_text_from_pdf' else f"{rows / elapsed:10,.0f} rows/s "
+        print(f"  {name:26} {elapsed:8.3f} s  {rate}  peak {peak / (1024 * 1024):7.1f} MB")
+    mismatched = 0
+    for layout, counts in sorted(accuracy.items()):
+        recall = counts['matched'] / counts['expected'] if counts['expected'] else 1.0
+        precision = counts['matched'] / counts['found'] if counts['found'] else 1.0
+        mismatched += counts['reports'] - counts['exact']
+        print(
+            f"  {layout:7} {counts['exact']}/{counts['reports']} report(s) exact, "
+            f"recall {recall:.1%}, precision {precision:.1%}"
+        )
+    if args.check and mismatched:
+        sys.exit(f"{mismatched} report(s) differ from the manifest")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Startup benchmark for the Django process.
+
+Runs each scenario in fresh interpreters and reports wall time and peak RSS:
+
+  wsgi   import hospital_project.wsgi and serve one request to the home page
+         (time-to-first-request of a gunicorn worker)
+  check  python manage.py check
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --max-ms 1500 --max-rss-mb 120   # exit 1 on regression
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be imported by the report analysis code path
+HEAVY_MODULES = ['pdfplumber', 'pandas', 'numpy']
+
+WSGI_FIRST_REQUEST = f"""
+import sys
+from wsgiref.util import setup_testing_defaults
+from hospital_project.wsgi import application
+
+environ = {{'PATH_INFO': '/', 'SERVER_NAME': 'localhost', 'HTTP_HOST': 'localhost'}}
+setup_testing_defaults(environ)
+statuses = []
+body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+b''.join(body)
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(statuses[0].split()[0], ','.join(loaded))
+"""
+
+SCENARIOS = {
+    'wsgi': [sys.executable, '-c', WSGI_FIRST_REQUEST],
+    'check': [sys.executable, 'manage.py', 'check'],
+}
+
+
+def run_once(command):
+    """Run `command` in a child process; returns (seconds, peak RSS in MB, stdout)"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='hospital_project.settings', PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.stdout.read().decode()
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status):
+        sys.exit(f"{' '.join(command[:2])} failed:\n{output}")
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else usage.ru_maxrss / 1024
+    return elapsed, rss_mb, output.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append')
+    parser.add_argument('--max-ms', type=float, help='Fail when a median wall time exceeds this')
+    parser.add_argument('--max-rss-mb', type=float, help='Fail when a median peak RSS exceeds this')
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.scenario or sorted(SCENARIOS, reverse=True):
+        results = [run_once(SCENARIOS[name]) for _ in range(args.runs)]
+        times = [elapsed * 1000 for elapsed, _, _ in results]
+        rss = [rss_mb for _, rss_mb, _ in results]
+        print(f"{name:6} median {statistics.median(times):8.1f} ms  min {min(times):8.1f} ms  "
+              f"peak RSS {statistics.median(rss):6.1f} MB")
+        if name == 'wsgi':
+            status, _, loaded = results[-1][2].splitlines()[-1].partition(' ')
+            print(f"       first response: {status}; heavy modules loaded: {loaded or 'none'}")
+        if args.max_ms and statistics.median(times) > args.max_ms:
+            print(f"       over the {args.max_ms} ms budget")
+            failed = True
+        if args.max_rss_mb and statistics.median(rss) > args.max_rss_mb:
+            print(f"       over the {args.max_rss_mb} MB budget")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
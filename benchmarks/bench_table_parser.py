@@ -0,0 +1,167 @@
+"""
+Micro-benchmark for the lab report table parser.
+
+Compares hospital.analysis.extract_abnormal_results against the original
+match_header_line / parse_table_lines implementation (kept below as the
+reference) on synthetic report text, and checks both produce the same rows.
+
+    python benchmarks/bench_table_parser.py --tables 200 --rows 40
+    python benchmarks/bench_table_parser.py --pdf media/test_results/2025/07/12/Test1.pdf
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_project.settings')
+
+import django
+
+django.setup()
+
+from hospital.analysis import HEADER_ALIASES, extract_abnormal_results, extract_text_from_pdf, fallback_regex_extraction
+
+
+def legacy_match_header_line(line):
+    tokens = re.split(r'\s{2,}', line.strip())
+    found = {key: None for key in HEADER_ALIASES}
+
+    for idx, token in enumerate(tokens):
+        token_lower = token.lower().strip()
+        for key, aliases in HEADER_ALIASES.items():
+            if any(alias in token_lower for alias in aliases):
+                found[key] = idx
+
+    if all(v is not None for v in found.values()):
+        return found
+    return None
+
+
+def legacy_parse_table_lines(lines, header_map, start_index):
+    results = []
+    for line in lines[start_index + 1:]:
+        if re.search(r'(end of report|clinical notes|doctor|pathologist|sample collection)', line, re.IGNORECASE):
+            break
+        tokens = re.split(r'\s{2,}', line.strip())
+        if len(tokens) < max(header_map.values()) + 1:
+            continue
+        try:
+            test = tokens[header_map["test"]].strip()
+            value_str = tokens[header_map["value"]].strip()
+            ref_str = tokens[header_map["reference"]].strip()
+
+            value_match = re.match(r"(L|H)?\s*(\d+(?:\.\d+)?)(?:\s*(L|H))?", value_str)
+            if not value_match:
+                continue
+            flag = value_match.group(1) or value_match.group(3)
+            value = float(value_match.group(2))
+
+            ref_vals = re.findall(r"\d+(?:\.\d+)?", ref_str)
+            if len(ref_vals) >= 2:
+                low, high = float(ref_vals[0]), float(ref_vals[1])
+            elif "<" in ref_str and len(ref_vals) == 1:
+                low, high = 0, float(ref_vals[0])
+            else:
+                continue
+
+            if not flag:
+                if value < low:
+                    flag = "Low"
+                elif value > high:
+                    flag = "High"
+                else:
+                    continue
+
+            results.append({
+                "Test": test,
+                "Status": flag
+            })
+        except Exception:
+            continue
+    return results
+
+
+def legacy_extract_abnormal_results(text):
+    lines = text.split("\n")
+    # The current parser also ignores everything after an "end of report" line
+    for idx, line in enumerate(lines):
+        if re.search(r'end of report', line, re.IGNORECASE):
+            lines = lines[:idx + 1]
+            text = "\n".join(lines)
+            break
+    all_results = []
+
+    for idx, line in enumerate(lines):
+        header_map = legacy_match_header_line(line)
+        if header_map:
+            all_results.extend(legacy_parse_table_lines(lines, header_map, idx))
+
+    if not all_results:
+        all_results = fallback_regex_extraction(text)
+
+    return all_results
+
+
+HEADERS = [
+    "Test Name    Result    Unit    Reference Range",
+    "Investigation    Observed Value    Units    Normal Range",
+    "Parameter    Reading    Measurement    Reference",
+]
+ANALYTES = ["Hemoglobin", "Glucose", "HbA1c", "Cholesterol", "TSH", "Creatinine", "Platelet Count", "WBC"]
+
+
+def synthetic_report(tables, rows, end_marker_every, seed=0):
+    """Report text with `tables` tables of `rows` rows; only every Nth table is closed by a marker"""
+    rng = random.Random(seed)
+    lines = []
+    for table in range(tables):
+        lines.append(rng.choice(HEADERS))
+        for _ in range(rows):
+            low = round(rng.uniform(1, 50), 1)
+            high = round(low + rng.uniform(5, 50), 1)
+            value = round(rng.uniform(low * 0.5, high * 1.5), 1)
+            flag = rng.choice(["", "", "", " H", " L"])
+            lines.append(f"{rng.choice(ANALYTES)}    {value}{flag}    mg/dL    {low} - {high}")
+        if end_marker_every and (table + 1) % end_marker_every == 0:
+            lines.append("Sample collection: Main lab")
+    return "\n".join(lines)
+
+
+def best_of(func, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=30)
+    parser.add_argument('--end-marker-every', type=int, default=5,
+                        help='Close every Nth table with an end-of-table marker (0 = never)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pdf', action='append', default=[], help='Also benchmark the text of this PDF')
+    args = parser.parse_args()
+
+    samples = [("synthetic", synthetic_report(args.tables, args.rows, args.end_marker_every))]
+    samples += [(path, extract_text_from_pdf(path)) for path in args.pdf]
+
+    for name, text in samples:
+        legacy_time, legacy_rows = best_of(legacy_extract_abnormal_results, text, args.repeat)
+        new_time, new_rows = best_of(extract_abnormal_results, text, args.repeat)
+        if new_rows != legacy_rows:
+            sys.exit(f"{name}: output differs from the reference implementation")
+        lines = text.count("\n") + 1
+        print(f"{name}: {lines} lines, {len(new_rows)} abnormal rows")
+        print(f"  legacy      {legacy_time * 1000:10.1f} ms")
+        print(f"  single-pass {new_time * 1000:10.1f} ms  ({legacy_time / new_time:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
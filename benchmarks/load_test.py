@@ -0,0 +1,157 @@
+"""
+End-to-end load test of every URL in hospital/urls.py, per role.
+
+Seeds a test database with `manage.py seed_data` (in memory with the default
+SQLite settings), logs a Django test client in as a patient, a doctor, a
+receptionist, a tester and an anonymous visitor, and requests every URL
+pattern as each of them with GET, filling URL parameters with rows that user
+would reach from their pages. Reports the status and p50/p95/p99 latency per
+role and URL, then per role over the pages that answered 200.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --appointments 200000 --requests 50 --role doctor
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_project.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import URLPattern, reverse
+
+from hospital.models import Appointment, ReportUpload, TestRequest, TestResult, User
+from hospital.urls import urlpatterns
+
+ROLES = ('patient', 'doctor', 'receptionist', 'tester', 'anonymous')
+# Requested once at the end, as it logs the client out
+LAST = {'logout'}
+
+
+def pick_users():
+    """The busiest seeded user of each role, so their pages carry realistic data"""
+    doctor = User.objects.get(pk=Appointment.objects.filter(status='SCH').values_list('doctor_id', flat=True).first())
+    patient = User.objects.get(
+        pk=Appointment.objects.filter(doctor=doctor, status='COM').values_list('patient_id', flat=True).first()
+    )
+    return {
+        'patient': patient,
+        'doctor': doctor,
+        'receptionist': User.objects.filter(is_receptionist=True).first(),
+        'tester': User.objects.filter(is_tester=True).first(),
+        'anonymous': None,
+    }
+
+
+def url_arguments(role, user):
+    """Values for the URL parameters, as `user` would find them on their own pages"""
+    appointments = Appointment.objects.all()
+    results = TestResult.objects.all()
+    if role == 'doctor':
+        appointments = appointments.filter(doctor=user)
+        results = results.filter(test_request__appointment__doctor=user)
+    elif role == 'patient':
+        appointments = appointments.filter(patient__user=user)
+        results = results.filter(test_request__appointment__patient__user=user)
+    appointment = appointments.filter(status='SCH').first() or appointments.first()
+    test_status = 'PEN' if role == 'receptionist' else 'APP'
+    test_request = TestRequest.objects.filter(status=test_status).first()
+    if role == 'receptionist':
+        appointment = Appointment.objects.filter(status='PEN', doctor__isnull=True).first() or appointment
+    arguments = {
+        'appointment_id': appointment and appointment.pk,
+        'patient_id': appointment and appointment.patient_id,
+        'test_id': test_request and test_request.pk,
+        'result_id': results.values_list('pk', flat=True).first(),
+    }
+    if role == 'tester' and test_request:
+        upload = ReportUpload.objects.create(test_request=test_request, created_by=user, filename='report.pdf', size=1024)
+        arguments['upload_id'] = upload.upload_id
+    return arguments
+
+
+def url_for(pattern, arguments):
+    """The URL of `pattern` with its parameters filled in, or None when there is no value for one"""
+    names = list(pattern.pattern.converters)
+    if any(arguments.get(name) is None for name in names):
+        return None
+    return reverse(pattern.name, kwargs={name: arguments[name] for name in names})
+
+
+def drive(client, url, requests):
+    """(status, [ms per request]) for `requests` GETs of `url` after one warm-up request"""
+    response = client.get(url)
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+    return response.status_code, timings
+
+
+def percentiles(timings):
+    ordered = sorted(timings)
+    return [ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] for p in (50, 95, 99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--appointments', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=20, help='Timed requests per role and URL')
+    parser.add_argument('--role', choices=ROLES, action='append', help='Only load test these roles')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # 4xx/5xx answers are expected for other roles' pages and show in the report
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    settings.ALLOWED_HOSTS = ['testserver']
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    call_command('seed_data', doctors=args.doctors, patients=args.patients, appointments=args.appointments,
+                 seed=args.seed)
+
+    users = pick_users()
+    patterns = [p for p in urlpatterns if isinstance(p, URLPattern)]
+    patterns.sort(key=lambda p: p.name in LAST)
+    per_role = defaultdict(list)
+    print(f"\n{'role':13} {'url':30} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for role in args.role or ROLES:
+        user = users[role]
+        # Errors become 500 responses in the report instead of stopping the run
+        client = Client(raise_request_exception=False)
+        if user is not None:
+            client.force_login(user)
+        arguments = url_arguments(role, user)
+        for pattern in patterns:
+            url = url_for(pattern, arguments)
+            if url is None:
+                print(f'{role:13} {pattern.name:30} {"-":>6}  no row to request it with')
+                continue
+            status, timings = drive(client, url, args.requests)
+            p50, p95, p99 = percentiles(timings)
+            print(f'{role:13} {pattern.name:30} {status:6} {p50:8.1f} {p95:8.1f} {p99:8.1f}')
+            if status == 200:
+                per_role[role] += timings
+
+    print(f"\n{'role':13} {'pages':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}   (200 responses only)")
+    for role, timings in per_role.items():
+        p50, p95, p99 = percentiles(timings)
+        print(f'{role:13} {len(timings) // args.requests:6} {p50:8.1f} {p95:8.1f} {p99:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Synthetic lab-report PDFs for the parser benchmarks.
+
+Writes minimal PDFs by hand (one monospace Courier text block per page, no
+dependencies) in either of two layouts:
+
+  table   padded columns under a header built from HEADER_ALIASES, in a random
+          column order, with L/H flags before or after the value
+  inline  "Name value [Low|High|Borderline] low - high unit" lines, as in the
+          lab reports uploaded so far
+
+Rows, noise lines (instrument notes, page footers, ...) and flags are drawn
+from a seeded RNG. manifest.json lists, per report, the abnormal rows a
+correct parser should return, so speed and correctness can be checked
+together.
+
+    python benchmarks/synthetic_reports.py --out /tmp/corpus --reports 20 --pages 5
+    python benchmarks/synthetic_reports.py --out /tmp/corpus --layout table --flag-rate 0.3 --noise 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital_project.settings')
+
+import django
+
+django.setup()
+
+from hospital.analysis import HEADER_ALIASES, compile_header_aliases
+
+LAYOUTS = ('table', 'inline')
+
+# (name, unit, low, high); names avoid digits so the free-text regex can match them
+ANALYTES = [
+    ("Hemoglobin (Hb)", "g/dL", 13.0, 17.0),
+    ("Total RBC count", "mill/cumm", 4.5, 5.5),
+    ("Packed Cell Volume (PCV)", "%", 40, 50),
+    ("Mean Corpuscular Volume (MCV)", "fL", 83, 101),
+    ("MCHC", "g/dL", 32.5, 34.5),
+    ("Total WBC count", "cumm", 4000, 11000),
+    ("Neutrophils", "%", 50, 62),
+    ("Lymphocytes", "%", 20, 40),
+    ("Platelet Count", "cumm", 150000, 410000),
+    ("Fasting Glucose", "mg/dL", 70, 100),
+    ("Serum Creatinine", "mg/dL", 0.7, 1.3),
+    ("Total Cholesterol", "mg/dL", 0, 200),
+    ("Triglycerides", "mg/dL", 0, 150),
+    ("Serum Sodium", "mmol/L", 135, 145),
+]
+NOISE_LINES = [
+    "Calculated",
+    "Primary Sample Type : Blood",
+    "Instruments: Fully automated cell counter",
+    "Method: Photometry",
+    "Interpretation: Correlate clinically",
+]
+LINES_PER_PAGE = 68
+
+
+def header_choices():
+    """Title-cased aliases per column that match their own column and no other"""
+    patterns = compile_header_aliases(HEADER_ALIASES)
+    choices = {}
+    for key, aliases in HEADER_ALIASES.items():
+        choices[key] = [
+            alias.title() for alias in aliases
+            if [k for k, pattern in patterns if pattern.search(alias)] == [key]
+        ]
+    return choices
+
+
+def table_section(rng, rows, flag_rate, noise):
+    """Lines of one table and the abnormal rows the table parser should report"""
+    choices = header_choices()
+    columns = list(HEADER_ALIASES)
+    rng.shuffle(columns)
+    widths = {"test": 30, "value": 10, "unit": 11, "reference": 18}
+    lines = ["  ".join(rng.choice(choices[key]).ljust(widths[key]) for key in columns).rstrip()]
+    abnormal = []
+    for _ in range(rows):
+        name, unit, low, high = rng.choice(ANALYTES)
+        value, status = draw_value(rng, low, high, flag_rate)
+        flag = {"Low": "L", "High": "H"}.get(status) if rng.random() < 0.7 else None
+        value_cell = str(value)
+        if flag:
+            value_cell = f"{flag} {value}" if rng.random() < 0.5 else f"{value} {flag}"
+        reference = f"< {high}" if low == 0 and rng.random() < 0.5 else f"{low} - {high}"
+        cells = {"test": name, "value": value_cell, "unit": unit, "reference": reference}
+        lines.append("  ".join(cells[key].ljust(widths[key]) for key in columns).rstrip())
+        if status:
+            abnormal.append({"Test": name, "Status": flag or status})
+        if rng.random() < noise:
+            lines.append(rng.choice(NOISE_LINES))
+    lines.append("Sample collection: Main lab")
+    return lines, abnormal
+
+
+def inline_section(rng, rows, flag_rate, noise):
+    """Lines in the free-text layout and the abnormal rows the fallback regex should report"""
+    lines = ["Investigation Result Reference Value Unit"]
+    abnormal = []
+    for _ in range(rows):
+        name, unit, low, high = rng.choice(ANALYTES)
+        value, status = draw_value(rng, low, high, flag_rate)
+        printed = status if status and rng.random() < 0.7 else None
+        if not status and rng.random() < flag_rate / 4:
+            printed = status = "Borderline"
+        lines.append(f"{name} {value}{' ' + printed if printed else ''} {low} - {high} {unit}")
+        if status:
+            abnormal.append({"Test": name, "Status": printed or status})
+        if rng.random() < noise:
+            lines.append(rng.choice(NOISE_LINES))
+    return lines, abnormal
+
+
+def draw_value(rng, low, high, flag_rate):
+    """A value and whether it is "Low", "High" or within range (None)"""
+    width = high - low
+    if rng.random() < flag_rate:
+        if low > 0 and rng.random() < 0.5:
+            return round(rng.uniform(low - width * 0.5, low - width * 0.01), 2), "Low"
+        return round(rng.uniform(high + width * 0.01, high + width * 0.5), 2), "High"
+    return round(rng.uniform(low, high), 2), None
+
+
+def report_lines(rng, pages, layout, flag_rate, noise):
+    """Text lines filling roughly `pages` pages, the number of result rows and the expected abnormal rows"""
+    lines = [
+        "SYNTHETIC PATHOLOGY LAB",
+        f"Patient: Test Patient {rng.randint(1, 9999)}    Age : {rng.randint(1, 90)} Years",
+        "Registered on: 02:31 PM 02 Dec",
+    ]
+    abnormal = []
+    total_rows = 0
+    section = table_section if layout == "table" else inline_section
+    while len(lines) < pages * LINES_PER_PAGE - 4:
+        rows = min(rng.randint(8, 30), max(1, (pages * LINES_PER_PAGE - 4 - len(lines)) // 2))
+        section_lines, section_abnormal = section(rng, rows, flag_rate, noise)
+        lines.extend(section_lines)
+        abnormal.extend(section_abnormal)
+        total_rows += rows
+    lines.extend(["****End of Report****", "Dr. Pathologist (MD, Pathologist)"])
+    return lines, total_rows, abnormal
+
+
+def pdf_string(text):
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def write_pdf(path, lines):
+    """Write `lines` as an A4 PDF in 9pt Courier, LINES_PER_PAGE lines per page"""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    font_id = 3
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        font_id: "<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for number, page_lines in enumerate(pages, start=1):
+        text = " ".join(f"{pdf_string(line)} '" for line in page_lines + [f"Page {number} of {len(pages)}"])
+        stream = f"BT /F1 9 Tf 11 TL 36 806 Td {text} ET".encode("latin-1")
+        page_id, content_id = 2 + 2 * number, 3 + 2 * number
+        kids.append(f"{page_id} 0 R")
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        objects[content_id] = f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_id in range(1, max(objects) + 1):
+        body = objects[object_id]
+        offsets.append(len(out))
+        out += f"{object_id} 0 obj\n".encode()
+        out += body if isinstance(body, bytes) else body.encode("latin-1")
+        out += b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+    return len(pages)
+
+
+def generate_corpus(out_dir, reports=10, pages=3, layout="mixed", flag_rate=0.2, noise=0.1, seed=0):
+    """Write `reports` PDFs and manifest.json into `out_dir`; returns the manifest entries"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for index in range(reports):
+        report_layout = LAYOUTS[index % len(LAYOUTS)] if layout == "mixed" else layout
+        lines, rows, abnormal = report_lines(rng, pages, report_layout, flag_rate, noise)
+        name = f"report_{index:04d}_{report_layout}.pdf"
+        page_count = write_pdf(os.path.join(out_dir, name), lines)
+        manifest.append({
+            "file": name,
+            "layout": report_layout,
+            "pages": page_count,
+            "lines": len(lines),
+            "rows": rows,
+            "abnormal": abnormal,
+        })
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument('--reports', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=3, help='Pages per report')
+    parser.add_argument('--layout', choices=LAYOUTS + ('mixed',), default='mixed')
+    parser.add_argument('--flag-rate', type=float, default=0.2, help='Share of rows outside their range')
+    parser.add_argument('--noise', type=float, default=0.1, help='Chance of a noise line after each row')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', required=True, help='Directory for the PDFs and manifest.json')
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.out, args.reports, args.pages, args.layout, args.flag_rate, args.noise, args.seed)
+    pages = sum(entry["pages"] for entry in manifest)
+    print(f"Wrote {len(manifest)} report(s), {pages} page(s) to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,669 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from array import array
+from collections import namedtuple
+from contextlib import closing
+from datetime import timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LabObservation, ReportAnalysis
+from .page_cache import PageTextWriter, open_page_text
+from .storage import readable_path
+
+# Define column aliases for PDF parsing
+HEADER_ALIASES = {
+    "test": ["test", "investigation", "parameter", "name"],
+    "value": ["value", "result", "observed", "reading"],
+    "unit": ["unit", "units", "measurement", "measure"],
+    "reference": ["reference", "range", "normal", "reference range"]
+}
+
+# Bump whenever the parsing code changes its output, so cached analyses are redone
+PARSER_VERSION = 4
+# keep_blank_chars keeps runs of spaces inside a line, which the table parser splits
+# columns on; pdfplumber otherwise collapses them to one. Bump PAGE_TEXT_VERSION with
+# any change here, so sidecars of the old text are not reused.
+PAGE_TEXT_OPTIONS = {'keep_blank_chars': True}
+PAGE_TEXT_VERSION = 2
+
+class ReportBudgetExceeded(Exception):
+    """A report needed more pages, time or memory than ANALYSIS_MAX_* allows"""
+
+def current_rss_mb():
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def iter_pdf_pages(pdf_path, max_pages=None, max_seconds=None, max_rss_mb=None, start_page=0):
+    """
+    Yield the text of each page in turn, releasing pdfplumber's per-page caches as it
+    goes. Raises ReportBudgetExceeded before reading a page that would go over budget.
+    """
+    import pdfplumber  # Imported here to keep it out of web worker and manage.py startup
+
+    started = time.monotonic()
+    with pdfplumber.open(pdf_path) as pdf:
+        for number, page in enumerate(pdf.pages[start_page:], start=start_page + 1):
+            if max_pages and number > max_pages:
+                raise ReportBudgetExceeded(f"Report is longer than the {max_pages} page limit")
+            if max_seconds and time.monotonic() - started > max_seconds:
+                raise ReportBudgetExceeded(f"Report took longer than {max_seconds}s to read (stopped at page {number})")
+            if max_rss_mb and current_rss_mb() > max_rss_mb:
+                raise ReportBudgetExceeded(f"Report needed more than {max_rss_mb} MB of memory (stopped at page {number})")
+            yield page.extract_text(**PAGE_TEXT_OPTIONS) or ""
+            page.close()
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text from PDF using pdfplumber"""
+    pages = []
+    try:
+        for page_text in iter_pdf_pages(pdf_path):
+            if page_text:
+                pages.append(page_text + "\n")
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+    return "".join(pages)
+
+TOKEN_SPLIT_RE = re.compile(r'\s{2,}')
+REPORT_END_RE = re.compile(r'end of report', re.IGNORECASE)
+TABLE_END_RE = re.compile(r'(end of report|clinical notes|doctor|pathologist|sample collection)', re.IGNORECASE)
+TABLE_VALUE_RE = re.compile(r"(L|H)?\s*(\d+(?:\.\d+)?)(?:\s*(L|H))?")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+FALLBACK_ROW_RE = re.compile(
+    r'([A-Za-z ()/%-]{3,50})\s+(\d+(?:\.\d+)?)\s*(Low|High|Borderline)?\s+(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*([a-zA-Z/%]+)',
+    re.IGNORECASE
+)
+
+def compile_header_aliases(header_aliases):
+    """One regex per column that matches a token containing any of its aliases"""
+    return [
+        (key, re.compile("|".join(re.escape(alias) for alias in aliases) or r'(?!)'))
+        for key, aliases in header_aliases.items()
+    ]
+
+# One parsed result row. `flag` is the flag printed on the report (L, H, Low, ...)
+# until classify_observations fills it in; None means the value is normal.
+Observation = namedtuple('Observation', ['test', 'value', 'unit', 'low', 'high', 'flag'])
+
+# Everything ReportParser collected from one report, before classification. `columns`
+# optionally holds the value/low/high of every row (table rows, observations, then
+# fallback rows) as array('d'), packed by the worker so classification can skip it.
+# `pages` is the number of pages read.
+ParsedReport = namedtuple(
+    'ParsedReport', ['table_rows', 'observations', 'fallback_rows', 'columns', 'pages'], defaults=[None, 0]
+)
+
+def parse_table_row(tokens, header_map):
+    """Return an Observation for a table row, or None when the row has no usable value and range"""
+    try:
+        test = tokens[header_map["test"]].strip()
+        value_str = tokens[header_map["value"]].strip()
+        unit = tokens[header_map["unit"]].strip()
+        ref_str = tokens[header_map["reference"]].strip()
+
+        value_match = TABLE_VALUE_RE.match(value_str)
+        if not value_match:
+            return None
+        flag = value_match.group(1) or value_match.group(3)
+        value = float(value_match.group(2))
+
+        ref_vals = NUMBER_RE.findall(ref_str)
+        if len(ref_vals) >= 2:
+            low, high = float(ref_vals[0]), float(ref_vals[1])
+        elif "<" in ref_str and len(ref_vals) == 1:
+            low, high = 0, float(ref_vals[0])
+        else:
+            return None
+        return Observation(test, value, unit, low, high, flag)
+    except Exception:
+        return None
+
+class TableParser:
+    """
+    Single-pass state machine over the lines of a report. Every header line opens a
+    table that collects rows until the next end-of-table marker, which gives the
+    same rows, in the same order, as rescanning the rest of the document from each
+    header, but reads and tokenizes each line only once.
+    """
+
+    def __init__(self, header_aliases=None):
+        self.header_patterns = compile_header_aliases(
+            HEADER_ALIASES if header_aliases is None else header_aliases
+        )
+        self.tables = []
+        self.open_tables = []
+        self.observations = []
+
+    def match_header(self, line):
+        lowered = line.lower()
+        if not all(pattern.search(lowered) for _, pattern in self.header_patterns):
+            return None
+
+        found = {key: None for key, _ in self.header_patterns}
+        for idx, token in enumerate(TOKEN_SPLIT_RE.split(line.strip())):
+            token_lower = token.lower().strip()
+            for key, pattern in self.header_patterns:
+                if pattern.search(token_lower):
+                    found[key] = idx
+
+        if all(v is not None for v in found.values()):
+            return found
+        return None
+
+    def feed(self, line):
+        if self.open_tables:
+            if TABLE_END_RE.search(line):
+                self.open_tables = []
+            else:
+                tokens = TOKEN_SPLIT_RE.split(line.strip())
+                parsed = {}
+                for header_map, min_tokens, rows in self.open_tables:
+                    if len(tokens) < min_tokens:
+                        continue
+                    columns = tuple(header_map.values())
+                    if columns not in parsed:
+                        parsed[columns] = parse_table_row(tokens, header_map)
+                    if parsed[columns]:
+                        rows.append(parsed[columns])
+                # Overlapping tables can parse the same line; keep one observation per line
+                observation = next((row for row in parsed.values() if row), None)
+                if observation:
+                    self.observations.append(observation)
+
+        header_map = self.match_header(line)
+        if header_map:
+            table = (header_map, max(header_map.values()) + 1, [])
+            self.tables.append(table)
+            self.open_tables.append(table)
+
+    def rows(self):
+        return [row for _, _, rows in self.tables for row in rows]
+
+def parse_fallback_line(line):
+    """Return an Observation for a free-text result line, or None"""
+    match = FALLBACK_ROW_RE.match(line)
+    if not match:
+        return None
+    return Observation(
+        match.group(1).strip(),
+        float(match.group(2)),
+        match.group(6),
+        float(match.group(4)),
+        float(match.group(5)),
+        match.group(3),
+    )
+
+# Below this many rows the per-row loop is faster than setting up NumPy arrays
+VECTORIZE_MIN_ROWS = 256
+# classify_flags returns indexes into this list
+FLAG_LABELS = [None, "Low", "High", "Critical Low", "Critical High", "Borderline"]
+
+def classify_value(value, low, high, flag=None, bands=None):
+    """
+    Per-row flag logic: a flag printed on the report wins, otherwise the value is
+    compared with its reference range. `bands` optionally adds 'borderline' (fraction
+    of the range width inside either bound) and 'critical' (fraction beyond it).
+    """
+    if flag:
+        return flag
+    bands = bands or {}
+    width = high - low
+    if value < low:
+        if 'critical' in bands and value < low - width * bands['critical']:
+            return "Critical Low"
+        return "Low"
+    if value > high:
+        if 'critical' in bands and value > high + width * bands['critical']:
+            return "Critical High"
+        return "High"
+    if 'borderline' in bands and (value - low <= width * bands['borderline'] or high - value <= width * bands['borderline']):
+        return "Borderline"
+    return None
+
+def classify_flags(values, lows, highs, bands=None):
+    """
+    Vectorized classify_value for NumPy float arrays, ignoring printed flags.
+    Returns an int8 array of indexes into FLAG_LABELS.
+    """
+    import numpy as np
+
+    bands = bands or {}
+    width = highs - lows
+    codes = np.zeros(len(values), dtype=np.int8)
+    below = values < lows
+    above = ~below & (values > highs)
+    codes[above] = 2
+    codes[below] = 1
+    if 'critical' in bands:
+        codes[above & (values > highs + width * bands['critical'])] = 4
+        codes[below & (values < lows - width * bands['critical'])] = 3
+    if 'borderline' in bands:
+        margin = width * bands['borderline']
+        codes[~below & ~above & ((values - lows <= margin) | (highs - values <= margin))] = 5
+    return codes
+
+def pack_columns(rows):
+    """(values, lows, highs) of `rows` as array('d') columns for classify_observations"""
+    return tuple(array('d', [getattr(row, field) for row in rows]) for field in ('value', 'low', 'high'))
+
+def classify_observations(observations, bands=None, columns=None):
+    """
+    Flags for many observations at once, identical to classify_value row by row.
+    Large batches whose value columns were already packed by pack_columns are
+    classified in one NumPy pass; packing rows here would cost more than it saves.
+    """
+    if columns is None or len(observations) < VECTORIZE_MIN_ROWS:
+        return [classify_value(row.value, row.low, row.high, row.flag, bands) for row in observations]
+    try:
+        import numpy as np
+    except ImportError:
+        return [classify_value(row.value, row.low, row.high, row.flag, bands) for row in observations]
+
+    codes = classify_flags(*(np.frombuffer(column, dtype=float) for column in columns), bands)
+    labels = FLAG_LABELS
+    return [row.flag or labels[code] for row, code in zip(observations, codes.tolist())]
+
+def summarize_reports(parsed_reports, bands=None):
+    """
+    Classify the rows of many ParsedReports in a single pass and return, per report,
+    (abnormal_results, observations). Table rows win unless only the free-text
+    fallback found abnormal values.
+    """
+    rows = []
+    for parsed in parsed_reports:
+        rows.extend(parsed.table_rows)
+        rows.extend(parsed.observations)
+        rows.extend(parsed.fallback_rows)
+    columns = None
+    if parsed_reports and all(parsed.columns for parsed in parsed_reports):
+        columns = [array('d') for _ in range(3)]
+        for parsed in parsed_reports:
+            for merged, column in zip(columns, parsed.columns):
+                merged.extend(column)
+    flags = classify_observations(rows, bands, columns)
+
+    summaries = []
+    position = 0
+    for parsed in parsed_reports:
+        table_flags, observation_flags, fallback_flags = [], [], []
+        for group, group_flags in zip(parsed[:3], (table_flags, observation_flags, fallback_flags)):
+            group_flags.extend(flags[position:position + len(group)])
+            position += len(group)
+
+        table_abnormal = [
+            {"Test": row.test, "Status": flag} for row, flag in zip(parsed.table_rows, table_flags) if flag
+        ]
+        fallback_abnormal = [
+            {"Test": row.test, "Status": flag} for row, flag in zip(parsed.fallback_rows, fallback_flags) if flag
+        ]
+        if table_abnormal or (parsed.observations and not fallback_abnormal):
+            abnormal, kept, kept_flags = table_abnormal, parsed.observations, observation_flags
+        else:
+            abnormal, kept, kept_flags = fallback_abnormal, parsed.fallback_rows, fallback_flags
+        summaries.append((abnormal, [row._replace(flag=flag) for row, flag in zip(kept, kept_flags)]))
+    return summaries
+
+def fallback_regex_extraction(text):
+    rows = [row for row in map(parse_fallback_line, text.split("\n")) if row]
+    return [
+        {"Test": row.test, "Status": flag}
+        for row, flag in zip(rows, classify_observations(rows))
+        if flag
+    ]
+
+class ReportParser:
+    """
+    Incremental parser for a whole report. Lines go through the table parser and the
+    fallback regex together, so the report never has to be held in memory, and
+    everything after an "end of report" line is ignored.
+    """
+
+    def __init__(self, header_aliases=None):
+        self.tables = TableParser(header_aliases)
+        self.fallback_rows = []
+        self.finished = False
+
+    def feed(self, line):
+        if self.finished:
+            return
+        if REPORT_END_RE.search(line):
+            self.finished = True
+        self.tables.feed(line)
+        row = parse_fallback_line(line)
+        if row:
+            self.fallback_rows.append(row)
+
+    def parsed(self, pack=False):
+        """The collected rows as a ParsedReport, with value columns packed when `pack` is set"""
+        table_rows = self.tables.rows()
+        observations = list(self.tables.observations)
+        fallback_rows = list(self.fallback_rows)
+        columns = pack_columns(table_rows + observations + fallback_rows) if pack else None
+        return ParsedReport(table_rows, observations, fallback_rows, columns)
+
+def extract_abnormal_results(text):
+    parser = ReportParser()
+    for line in text.split("\n"):
+        parser.feed(line)
+    abnormal_results, _ = summarize_reports([parser.parsed()], flag_bands())[0]
+    return abnormal_results
+
+def page_text_path(content_hash):
+    return os.path.join(settings.MEDIA_ROOT, 'analysis', 'pages', content_hash[:2], f'{content_hash}.v{PAGE_TEXT_VERSION}.pages')
+
+def iter_report_pages(pdf_path, content_hash, **budgets):
+    """
+    Yield page text for a report, from its compressed sidecar when one exists. The
+    first pass reads the PDF with pdfplumber and records every page it yields, so
+    re-analysis after a rules change never has to run pdfplumber again. When an
+    earlier run stopped early, the pages read from the PDF this time are added to
+    the sidecar, so each resume continues where the last one stopped.
+    """
+    sidecar_path = page_text_path(content_hash)
+    reader = open_page_text(sidecar_path)
+    if reader is not None and reader.complete:
+        with reader:
+            yield from reader
+        return
+
+    writer = PageTextWriter(sidecar_path)
+    complete = False
+    copied = 0
+    try:
+        if reader is not None:
+            for page_text in reader:
+                writer.add(page_text)
+                copied += 1
+                yield page_text
+        for page_text in iter_pdf_pages(pdf_path, start_page=copied, **budgets):
+            writer.add(page_text)
+            yield page_text
+        complete = True
+    finally:
+        if reader is not None:
+            # Keep every page the earlier run saved, even when this one stopped sooner
+            for number in range(copied, len(reader)):
+                writer.add(reader.page(number))
+            reader.close()
+        writer.close(complete)
+
+def analyze_pdf(pdf_path, content_hash=None):
+    """
+    Stream a PDF through ReportParser page by page, stopping at the end-of-report
+    marker and within the ANALYSIS_MAX_PAGES/SECONDS/RSS_MB budgets. Page text is
+    read from and saved to the sidecar for `content_hash` when one is given.
+    Returns the unclassified ParsedReport.
+    """
+    parser = ReportParser()
+    budgets = {
+        'max_pages': settings.ANALYSIS_MAX_PAGES,
+        'max_seconds': settings.ANALYSIS_MAX_SECONDS,
+        'max_rss_mb': settings.ANALYSIS_MAX_RSS_MB,
+    }
+    if content_hash:
+        pages = iter_report_pages(pdf_path, content_hash, **budgets)
+    else:
+        pages = iter_pdf_pages(pdf_path, **budgets)
+    page_count = 0
+    with closing(pages):
+        for page_text in pages:
+            page_count += 1
+            for line in page_text.split("\n"):
+                parser.feed(line)
+            if parser.finished:
+                break
+    return parser.parsed(pack=True)._replace(pages=page_count)
+
+# Analysis cache
+def flag_bands():
+    return getattr(settings, 'ANALYSIS_FLAG_BANDS', None) or {}
+
+def rules_version():
+    """Fingerprint of the parsing rules; changes whenever HEADER_ALIASES, the flag bands or PARSER_VERSION do"""
+    payload = json.dumps({"parser": PARSER_VERSION, "aliases": HEADER_ALIASES, "bands": flag_bands()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def stored_content_hash(field_file):
+    """The sha256 a content-addressed storage already keeps in the file name, or None"""
+    content_hash = getattr(field_file.storage, 'content_hash', None)
+    return content_hash(field_file.name) if content_hash else None
+
+def file_sha256(field_file, chunk_size=1024 * 1024):
+    stored = stored_content_hash(field_file)
+    if stored:
+        return stored
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in f.chunks(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def report_file_path(field_file):
+    """The report's file on disk, which may be a compressed archive copy"""
+    stored_path = getattr(field_file.storage, 'stored_path', None)
+    return stored_path(field_file.name) if stored_path else field_file.path
+
+def report_content_hash(field_file):
+    """The hash get_report_analyses compares an analysis against; '' when no file is attached"""
+    return file_sha256(field_file) if field_file else ''
+
+def run_analysis_job(pdf_path, content_hash=None):
+    """
+    Parse one report. Runs inside the worker pool, so it only touches the filesystem
+    and returns (content_hash, ParsedReport, error); flags are assigned by the
+    caller. A report that cannot be parsed comes back with no ParsedReport and the
+    error, still with its hash, so the failure is stored against that content. The
+    file is only hashed when the storage did not already know its hash, and
+    compressed archive copies are unpacked to a temporary file first.
+    """
+    with readable_path(pdf_path) as local_path:
+        if not content_hash:
+            digest = hashlib.sha256()
+            with open(local_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+        try:
+            return content_hash, analyze_pdf(local_path, content_hash), ''
+        except Exception as e:
+            return content_hash, None, str(e) or e.__class__.__name__
+
+def finish_analysis(analysis, content_hash, abnormal_results=None, observations=(), error='', pages=0):
+    """Store a job's outcome and replace the report's LabObservation rows"""
+    test_result = analysis.test_result
+    observed_on = timezone.localdate(test_result.completed_at) if test_result.completed_at else timezone.localdate()
+    with transaction.atomic():
+        analysis.status = 'FAI' if error else 'RDY'
+        analysis.content_hash = content_hash
+        analysis.rules_version = rules_version()
+        analysis.abnormal_results = abnormal_results or []
+        analysis.pages = pages
+        analysis.error = error
+        analysis.analyzed_at = timezone.now()
+        analysis.save()
+
+        LabObservation.objects.filter(test_result=test_result).delete()
+        LabObservation.objects.bulk_create([
+            LabObservation(
+                test_result=test_result,
+                patient_id=test_result.test_request.appointment.patient_id,
+                test_name=observation.test[:255],
+                test_key=LabObservation.key_for(observation.test),
+                value=observation.value,
+                unit=(observation.unit or '')[:50],
+                low=observation.low,
+                high=observation.high,
+                flag=LabObservation.flag_for(observation.flag),
+                observed_on=observed_on,
+            )
+            for observation in map(Observation._make, observations)
+        ], batch_size=500)
+    return analysis
+
+def enqueue_analyses(test_results):
+    """
+    Queue reports for the analysis workers. With ANALYSIS_QUEUE_EAGER set they are
+    analyzed right away instead, concurrently when there is more than one.
+    """
+    analyses = []
+    for test_result in test_results:
+        analysis, _ = ReportAnalysis.objects.update_or_create(
+            test_result=test_result,
+            defaults={
+                'status': 'PEN',
+                'error': '',
+                'queued_at': timezone.now(),
+                'started_at': None,
+            }
+        )
+        analyses.append(analysis)
+
+    if analyses and getattr(settings, 'ANALYSIS_QUEUE_EAGER', False):
+        ReportAnalysis.objects.filter(pk__in=[a.pk for a in analyses]).update(status='RUN', started_at=timezone.now())
+        if len(analyses) == 1:
+            run_analyses(None, analyses)
+        else:
+            with ProcessPoolExecutor(max_workers=min(len(analyses), os.cpu_count() or 1), initializer=django.setup) as executor:
+                run_analyses(executor, analyses)
+    return analyses
+
+def enqueue_analysis(test_result):
+    return enqueue_analyses([test_result])[0]
+
+def claim_pending_analyses(limit):
+    """Mark up to `limit` pending jobs as running; safe to call from several workers at once"""
+    candidates = ReportAnalysis.objects.filter(status='PEN').order_by('queued_at').values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in list(candidates)
+        if ReportAnalysis.objects.filter(pk=pk, status='PEN').update(status='RUN', started_at=timezone.now())
+    ]
+    return list(ReportAnalysis.objects.filter(pk__in=claimed).select_related('test_result__test_request__appointment'))
+
+def requeue_stale_analyses(max_age_seconds):
+    """Put jobs back in the queue whose worker died while running them"""
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    return ReportAnalysis.objects.filter(status='RUN', started_at__lt=cutoff).update(status='PEN', started_at=None)
+
+def start_analyses(test_results):
+    """
+    Mark the analyses of `test_results` as running, creating missing ones, so the
+    queue workers leave them alone. Used for bulk runs outside the queue.
+    """
+    now = timezone.now()
+    ids = [test_result.id for test_result in test_results]
+    existing = set(ReportAnalysis.objects.filter(test_result_id__in=ids).values_list('test_result_id', flat=True))
+    ReportAnalysis.objects.filter(test_result_id__in=existing).update(status='RUN', error='', queued_at=now, started_at=now)
+    ReportAnalysis.objects.bulk_create([
+        ReportAnalysis(test_result_id=pk, status='RUN', queued_at=now, started_at=now)
+        for pk in ids if pk not in existing
+    ], ignore_conflicts=True)
+    return list(
+        ReportAnalysis.objects.filter(test_result_id__in=ids)
+        .select_related('test_result__test_request__appointment')
+        .order_by('test_result_id')
+    )
+
+def failed_content_hash(test_result):
+    """
+    The hash to store with a job that failed before it could hash the file itself,
+    so the failure stays final until the file changes; '' when the file cannot be read.
+    """
+    try:
+        return report_content_hash(test_result.file)
+    except (OSError, ValueError):
+        return ''
+
+def run_analyses(executor, analyses):
+    """
+    Run claimed analysis jobs and store their outcome. All jobs are submitted to the
+    executor at once, so a batch takes about as long as its slowest report; without
+    an executor they run in this process. The rows of the whole batch are then
+    classified together in one vectorized pass.
+    """
+    futures = {}
+    outcomes = []
+
+    def record(analysis, content_hash, parsed, error):
+        if parsed is None:
+            finish_analysis(analysis, content_hash, error=error)
+        else:
+            outcomes.append((analysis, content_hash, parsed))
+
+    for analysis in analyses:
+        test_result = analysis.test_result
+        if not test_result.file:
+            finish_analysis(analysis, '', error='No report file attached')
+            continue
+        args = (report_file_path(test_result.file), stored_content_hash(test_result.file))
+        if executor is None:
+            try:
+                record(analysis, *run_analysis_job(*args))
+            except Exception as e:
+                finish_analysis(analysis, failed_content_hash(test_result), error=str(e))
+            continue
+        futures[executor.submit(run_analysis_job, *args)] = analysis
+
+    for future in as_completed(futures):
+        analysis = futures[future]
+        try:
+            record(analysis, *future.result())
+        except Exception as e:
+            finish_analysis(analysis, failed_content_hash(analysis.test_result), error=str(e))
+
+    summaries = summarize_reports([parsed for _, _, parsed in outcomes], flag_bands())
+    for (analysis, content_hash, parsed), (abnormal_results, observations) in zip(outcomes, summaries):
+        finish_analysis(analysis, content_hash, abnormal_results, observations, pages=parsed.pages)
+    return analyses
+
+def process_pending_analyses(executor, limit):
+    """Run a batch of queued analyses across the executor's processes; returns the number handled"""
+    return len(run_analyses(executor, claim_pending_analyses(limit)))
+
+def get_report_analyses(test_results):
+    """
+    Return {test_result.id: ReportAnalysis} for the given reports. New jobs are queued
+    for reports without an analysis or whose file content or parsing rules changed;
+    a failed analysis of the current file and rules is final, like a ready one.
+    """
+    existing = {
+        analysis.test_result_id: analysis
+        for analysis in ReportAnalysis.objects.filter(test_result__in=test_results)
+    }
+    version = rules_version()
+    analyses = {}
+    stale = []
+    for test_result in test_results:
+        analysis = existing.get(test_result.id)
+        if analysis and analysis.status in ('PEN', 'RUN'):
+            analyses[test_result.id] = analysis
+        elif analysis and analysis.is_current(report_content_hash(test_result.file), version):
+            analyses[test_result.id] = analysis
+        else:
+            stale.append(test_result)
+
+    for analysis in enqueue_analyses(stale):
+        analyses[analysis.test_result_id] = analysis
+    return analyses
+
+def get_report_analysis(test_result):
+    return get_report_analyses([test_result])[test_result.id]
@@ -0,0 +1,98 @@
+"""
+Summary counters for Appointment and TestRequest, per status and per status and
+day. Signals adjust them as rows are saved and deleted; reconcile() recounts them
+from the tables for anything that bypassed the signals (queryset.update(),
+bulk_create(), raw SQL).
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Appointment, StatusCounter, TestRequest
+
+def appointment_key(status, day=None):
+    return f'appointment:{status}' if day is None else f'appointment:{status}:{day}'
+
+def test_request_key(status, day=None):
+    return f'testrequest:{status}' if day is None else f'testrequest:{status}:{day}'
+
+# Pending appointments no doctor has been assigned to yet
+UNASSIGNED_KEY = 'appointment:PEN:unassigned'
+
+def appointment_keys(status, day, doctor_id):
+    keys = [appointment_key(status), appointment_key(status, day)]
+    if status == 'PEN' and doctor_id is None:
+        keys.append(UNASSIGNED_KEY)
+    return keys
+
+def test_request_keys(status, requested_at):
+    keys = [test_request_key(status)]
+    if requested_at is not None:
+        keys.append(test_request_key(status, timezone.localdate(requested_at)))
+    return keys
+
+def keys_for(instance):
+    if isinstance(instance, Appointment):
+        return appointment_keys(instance.status, instance.date, instance.doctor_id)
+    return test_request_keys(instance.status, instance.requested_at)
+
+def adjust(changes):
+    """Apply {key: delta} to the counters, creating the ones that do not exist yet"""
+    for key, delta in changes.items():
+        if not delta:
+            continue
+        if StatusCounter.objects.filter(key=key).update(count=F('count') + delta, updated_at=timezone.now()):
+            continue
+        try:
+            with transaction.atomic():
+                StatusCounter.objects.create(key=key, count=delta)
+        except IntegrityError:
+            # Another request created the counter first
+            StatusCounter.objects.filter(key=key).update(count=F('count') + delta, updated_at=timezone.now())
+
+def read(*keys):
+    """{key: count} for `keys` in one query; counters that were never touched are 0"""
+    counts = dict(StatusCounter.objects.filter(key__in=keys).values_list('key', 'count'))
+    return {key: counts.get(key, 0) for key in keys}
+
+def actual_counts():
+    """Every counter recounted from the tables"""
+    counts = Counter()
+    rows = Appointment.objects.order_by().values('status', 'date').annotate(n=Count('pk'))
+    for row in rows:
+        counts[appointment_key(row['status'])] += row['n']
+        counts[appointment_key(row['status'], row['date'])] += row['n']
+    counts[UNASSIGNED_KEY] = Appointment.objects.filter(status='PEN', doctor__isnull=True).count()
+    rows = TestRequest.objects.order_by().annotate(
+        day=TruncDate('requested_at', tzinfo=timezone.get_current_timezone())
+    ).values('status', 'day').annotate(n=Count('pk'))
+    for row in rows:
+        counts[test_request_key(row['status'])] += row['n']
+        counts[test_request_key(row['status'], row['day'])] += row['n']
+    return counts
+
+@transaction.atomic
+def reconcile():
+    """Rewrite the counters that drifted from the tables; returns {key: (stored, actual)} for each fix"""
+    actual = actual_counts()
+    stored = {counter.key: counter for counter in StatusCounter.objects.select_for_update()}
+    fixes = {
+        key: (stored[key].count if key in stored else 0, actual.get(key, 0))
+        for key in set(stored) | set(actual)
+        if (stored[key].count if key in stored else 0) != actual.get(key, 0)
+    }
+    now = timezone.now()
+    changed, created = [], []
+    for key, (_, count) in fixes.items():
+        if key in stored:
+            stored[key].count = count
+            stored[key].updated_at = now
+            changed.append(stored[key])
+        else:
+            created.append(StatusCounter(key=key, count=count))
+    StatusCounter.objects.bulk_update(changed, ['count', 'updated_at'], batch_size=500)
+    StatusCounter.objects.bulk_create(created, batch_size=500)
+    return fixes
@@ -0,0 +1,94 @@
+"""
+Per-role, per-user cache of dashboard data.
+
+Each cached dashboard is stored under a version number kept in the cache next to
+it, one version per (role, scope): the scope is the user's id for patients and
+doctors, whose dashboards only show their own rows, and ALL for receptionists and
+testers, who all see the same queues. The signals in hospital/signals.py bump the
+versions a write touches, which orphans the old entries; DASHBOARD_CACHE_TIMEOUT
+expires them and bounds staleness from writes no signal sees.
+"""
+import hashlib
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+
+ROLES = ('patient', 'doctor', 'receptionist', 'tester')
+# Scope of the dashboards every user of a role shares
+ALL = 'all'
+
+def dashboard_cache():
+    return caches['dashboards']
+
+def version_key(role, scope):
+    return f'dashboard-version:{role}:{scope}'
+
+def metric_key(role, outcome):
+    return f'dashboard-metrics:{role}:{outcome}'
+
+def increment(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # incr() only works on existing keys; add() loses nothing to a concurrent first hit
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass  # DummyCache keeps nothing
+
+def current_version(cache, role, scope):
+    version = cache.get(version_key(role, scope))
+    if version is None:
+        # Start from the clock rather than 0, so a version evicted from the cache can
+        # never come back to a number that still has stale entries stored under it
+        version = time.time_ns()
+        if not cache.add(version_key(role, scope), version, None):
+            version = cache.get(version_key(role, scope), version)
+    return version
+
+def invalidate(role, scope):
+    """Drop the cached dashboards of `scope` (a user id or ALL) for `role`"""
+    cache = dashboard_cache()
+    try:
+        cache.incr(version_key(role, scope))
+    except ValueError:
+        cache.set(version_key(role, scope), time.time_ns(), None)
+
+def cached_dashboard(role, scope, request, build):
+    """
+    The dashboard data `build()` returns, from the cache while no write has touched
+    it. The query string is part of the key, so each page of a paginated list is
+    cached separately; the date is too, as dashboards show "today".
+    """
+    cache = dashboard_cache()
+    query = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()[:16]
+    key = f'dashboard:{role}:{scope}:{current_version(cache, role, scope)}:{date.today()}:{query}'
+    data = cache.get(key)
+    if data is not None:
+        increment(cache, metric_key(role, 'hits'))
+        return data
+    increment(cache, metric_key(role, 'misses'))
+    data = build()
+    cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+def metrics():
+    """{role: {'hits', 'misses', 'hit_rate'}} since the metric counters were last reset"""
+    cache = dashboard_cache()
+    counts = cache.get_many([metric_key(role, outcome) for role in ROLES for outcome in ('hits', 'misses')])
+    stats = {}
+    for role in ROLES:
+        hits = counts.get(metric_key(role, 'hits'), 0)
+        misses = counts.get(metric_key(role, 'misses'), 0)
+        stats[role] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
+
+def reset_metrics():
+    dashboard_cache().delete_many([metric_key(role, outcome) for role in ROLES for outcome in ('hits', 'misses')])
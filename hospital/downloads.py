@@ -0,0 +1,111 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from .storage import codec_for_path, open_compressed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+def parse_range(header, size):
+    """
+    (start, end) for a single "bytes=" range, None to send the whole file (no header,
+    a malformed one or several ranges), or False when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # "bytes=-500": the last 500 bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+def iter_file_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            data = f.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+def sendfile_response(path):
+    """Hand the transfer to the front-end server when REPORT_SENDFILE is configured, else None"""
+    backend = settings.REPORT_SENDFILE
+    if backend == 'x-accel-redirect':
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = quote(settings.REPORT_SENDFILE_PREFIX.rstrip('/') + '/' + relative)
+        return response
+    if backend == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+        return response
+    return None
+
+def iter_decompressed(path):
+    with open_compressed(path) as f:
+        yield from iter(lambda: f.read(CHUNK_SIZE), b'')
+
+def report_file_response(request, path, filename, etag, size=None):
+    """
+    Serve a report file inline. With REPORT_SENDFILE set the front-end server sends
+    the bytes (and handles ranges itself); otherwise Range, If-Range and
+    If-None-Match are answered here so PDF viewers can fetch pages lazily.
+    Compressed archive copies are decompressed on the fly, without byte ranges;
+    `size` is then their uncompressed size.
+    """
+    stat = os.stat(path)
+    compressed = codec_for_path(path)
+    size = size if compressed else stat.st_size
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = None if compressed else sendfile_response(path)
+    if response is None:
+        if etag in parse_etags(request.headers.get('If-None-Match', '')) or request.headers.get('If-None-Match') == '*':
+            response = HttpResponseNotModified()
+        elif compressed:
+            response = StreamingHttpResponse(iter_decompressed(path), content_type=content_type)
+            if size is not None:
+                response['Content-Length'] = str(size)
+        else:
+            byte_range = None
+            if_range = request.headers.get('If-Range')
+            if not if_range or if_range == etag:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            if byte_range is False:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+            elif byte_range:
+                start, end = byte_range
+                response = StreamingHttpResponse(iter_file_range(path, start, end), status=206, content_type=content_type)
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response['Content-Length'] = str(end - start + 1)
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'none' if compressed else 'bytes'
+
+    if response.status_code != 304:
+        response['Content-Type'] = content_type
+    response['ETag'] = etag
+    response['Last-Modified'] = formatdate(stat.st_mtime, usegmt=True)
+    response['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(filename)}"
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,76 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hospital.models import StoredBlob
+from hospital.storage import available_codec, open_compressed, report_storage
+
+
+def timed_read(open_file):
+    """Seconds to read a file object to the end"""
+    start = time.perf_counter()
+    with open_file() as f:
+        while f.read(1024 * 1024):
+            pass
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = 'Compress report files nobody has uploaded again for a while; reads decompress them transparently'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.REPORT_ARCHIVE_AFTER_DAYS,
+                            help='Only compress reports first stored at least this many days ago')
+        parser.add_argument('--codec', choices=['zst', 'gz'], default=settings.REPORT_ARCHIVE_CODEC,
+                            help='zst needs the zstandard package; gz is used without it')
+        parser.add_argument('--limit', type=int, help='Compress at most this many reports')
+        parser.add_argument('--sample', type=int, default=20,
+                            help='Time reads of this many reports before and after compressing them')
+
+    def handle(self, *args, **options):
+        storage = report_storage()
+        codec = available_codec(options['codec'])
+        if codec != options['codec']:
+            self.stderr.write('zstandard is not installed, compressing with gzip')
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        blobs = StoredBlob.objects.filter(compression='', created_at__lt=cutoff).order_by('created_at')
+        if options['limit']:
+            blobs = blobs[:options['limit']]
+
+        compressed = original_bytes = stored_bytes = 0
+        plain_read = compressed_read = 0.0
+        sampled = 0
+        for blob in blobs.iterator():
+            path = storage.path(blob.name)
+            if not os.path.exists(path):
+                self.stderr.write(f'{blob.name} is missing, skipped')
+                continue
+            sample = sampled < options['sample']
+            if sample:
+                plain_read += timed_read(lambda: open(path, 'rb'))
+            stored_size = storage.compress(blob, codec)
+            if sample:
+                compressed_read += timed_read(lambda: open_compressed(storage.stored_path(blob.name)))
+                sampled += 1
+            compressed += 1
+            original_bytes += blob.size
+            stored_bytes += stored_size
+
+        saved = original_bytes - stored_bytes
+        self.stdout.write(
+            f'Compressed {compressed} report(s) with {codec}: {original_bytes / (1024 * 1024):.1f} MB -> '
+            f'{stored_bytes / (1024 * 1024):.1f} MB'
+        )
+        if sampled:
+            self.stdout.write(
+                f'Read latency over {sampled} report(s): {plain_read / sampled * 1000:.1f} ms plain, '
+                f'{compressed_read / sampled * 1000:.1f} ms compressed per report'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Space saved: {saved / (1024 * 1024):.1f} MB'
+            f'{f" ({saved / original_bytes:.0%})" if original_bytes else ""}'
+        ))
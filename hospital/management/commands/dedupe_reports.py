@@ -0,0 +1,69 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hospital.analysis import file_sha256
+from hospital.models import StoredBlob, TestResult
+from hospital.storage import report_storage
+
+
+class Command(BaseCommand):
+    help = 'Move report files uploaded before content-addressed storage into it, storing duplicates once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how much space would be saved')
+
+    def handle(self, *args, **options):
+        storage = report_storage()
+        dry_run = options['dry_run']
+        legacy = (
+            TestResult.objects.exclude(file='').exclude(file__isnull=True)
+            .exclude(file__startswith=f'{storage.prefix}/').order_by('pk')
+        )
+        stored = set(StoredBlob.objects.values_list('sha256', flat=True))
+        moved = missing = 0
+        removed_bytes = added_bytes = 0
+        for test_result in legacy.iterator():
+            old_name = test_result.file.name
+            if not storage.exists(old_name):
+                missing += 1
+                self.stderr.write(f'Report #{test_result.pk}: {old_name} is missing, skipped')
+                continue
+            size = storage.size(old_name)
+            content_hash = file_sha256(test_result.file)
+            blob_name = storage.blob_name(content_hash, old_name)
+            if content_hash not in stored:
+                stored.add(content_hash)
+                added_bytes += size
+            moved += 1
+            if dry_run:
+                removed_bytes += size
+                continue
+
+            blob_path = storage.path(blob_name)
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f'{blob_path}.tmp'
+                try:
+                    os.link(storage.path(old_name), tmp_path)
+                except OSError:
+                    shutil.copyfile(storage.path(old_name), tmp_path)
+                os.replace(tmp_path, blob_path)
+            with transaction.atomic():
+                storage.add_reference(content_hash, blob_name, size)
+                TestResult.objects.filter(pk=test_result.pk).update(file=blob_name)
+            # Another report may still point at the same legacy file
+            if not TestResult.objects.filter(file=old_name).exists():
+                storage.delete(old_name)
+                removed_bytes += size
+
+        saved = removed_bytes - added_bytes
+        verb = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(
+            f'{verb} {moved} report file(s) into content-addressed storage, {missing} missing; '
+            f'{removed_bytes / (1024 * 1024):.1f} MB of files now stored as {added_bytes / (1024 * 1024):.1f} MB'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Space saved: {saved / (1024 * 1024):.1f} MB'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hospital.models import ReportUpload
+from hospital.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked report uploads that were never finalized, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=int, default=24,
+                            help='Only purge uploads without a chunk for this many hours')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        purged = 0
+        for upload in ReportUpload.objects.filter(updated_at__lt=cutoff).iterator():
+            discard_upload(upload)
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} abandoned upload(s)'))
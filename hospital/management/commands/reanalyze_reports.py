@@ -0,0 +1,101 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hospital.analysis import failed_content_hash, rules_version, run_analyses, start_analyses
+from hospital.models import TestResult
+
+
+class Command(BaseCommand):
+    help = 'Re-analyze the whole lab report archive in batches, resuming from the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes parsing reports')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Reports read and analyzed per batch')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.MEDIA_ROOT, 'analysis', 'reanalyze_reports.json'),
+                            help='File recording progress so an interrupted run can resume')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and start from the first report')
+        parser.add_argument('--all', action='store_true',
+                            help='Also re-analyze reports already analyzed with the current rules')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Also retry reports whose analysis failed on the current file and rules')
+
+    def handle(self, *args, **options):
+        checkpoint_path = options['checkpoint']
+        state = {'last_id': 0, 'reports': 0, 'pages': 0, 'failed': 0, 'skipped': 0}
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state.update(json.load(f))
+            self.stdout.write(f"Resuming after report #{state['last_id']} ({state['reports']} already analyzed)")
+
+        version = rules_version()
+        run = {'reports': 0, 'pages': 0, 'failed': 0}
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=django.setup) as executor:
+            while True:
+                # Keyset pagination: each batch starts after the last id seen, so the
+                # query cost does not grow with the position in the archive.
+                batch = list(
+                    TestResult.objects.filter(pk__gt=state['last_id']).exclude(file='').exclude(file__isnull=True)
+                    .order_by('pk').values_list(
+                        'pk', 'file', 'analysis__status', 'analysis__rules_version', 'analysis__content_hash'
+                    )[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                pending = [TestResult(pk=row[0]) for row in batch if self.needs_analysis(row, version, options)]
+                done = {'reports': 0, 'pages': 0, 'failed': 0}
+                if pending:
+                    analyses = run_analyses(executor, start_analyses(pending))
+                    done['reports'] = len(analyses)
+                    done['pages'] = sum(analysis.pages for analysis in analyses)
+                    done['failed'] = sum(analysis.status == 'FAI' for analysis in analyses)
+                for key, count in done.items():
+                    run[key] += count
+                    state[key] += count
+                state['last_id'] = batch[-1][0]
+                state['skipped'] += len(batch) - len(pending)
+                self.write_checkpoint(checkpoint_path, state)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Analyzed up to report #{state['last_id']}: {run['reports']} report(s), "
+                    f"{run['reports'] / elapsed:.1f} reports/s, {run['pages'] / elapsed:.1f} pages/s"
+                )
+
+        elapsed = time.perf_counter() - started
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(
+            f"This run: {run['reports']} report(s), {run['pages']} page(s) in {elapsed:.1f}s "
+            f"({run['reports'] / elapsed if elapsed else 0:.1f} reports/s, "
+            f"{run['pages'] / elapsed if elapsed else 0:.1f} pages/s), {run['failed']} failed"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archive re-analyzed: {state['reports']} report(s), {state['pages']} page(s), "
+            f"{state['failed']} failed, {state['skipped']} already current"
+        ))
+
+    def needs_analysis(self, row, version, options):
+        pk, name, status, analysis_version, content_hash = row
+        if options['all'] or analysis_version != version or status not in ('RDY', 'FAI'):
+            return True
+        if status == 'FAI':
+            # A failure on the current file and rules is final, as in get_report_analyses()
+            return options['retry_failed'] or content_hash != failed_content_hash(TestResult(pk=pk, file=name))
+        return False
+
+    def write_checkpoint(self, path, state):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from hospital.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = ('Recount the appointment and test request summary counters from the tables, fixing any drift; '
+            'run it after deploying them and then periodically, e.g. nightly from cron')
+
+    def handle(self, *args, **options):
+        fixes = reconcile()
+        for key, (stored, actual) in sorted(fixes.items()):
+            self.stdout.write(f'{key}: {stored} -> {actual}')
+        self.stdout.write(self.style.SUCCESS(f'Fixed {len(fixes)} counter(s)'))
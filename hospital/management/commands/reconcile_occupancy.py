@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from hospital.occupancy import SLOT_BITS, double_bookings, reconcile
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the doctor slot occupancy masks from the appointments, fixing any drift, and list the slots '
+            'that more than one appointment holds; run it after bulk changes to appointments')
+
+    def handle(self, *args, **options):
+        fixes = reconcile()
+        width = len(SLOT_BITS)
+        for (doctor_id, day), (stored, actual) in sorted(fixes.items()):
+            self.stdout.write(f'doctor {doctor_id} on {day}: {stored:0{width}b} -> {actual:0{width}b}')
+        self.stdout.write(self.style.SUCCESS(f'Fixed {len(fixes)} doctor day(s)'))
+        for doctor_id, day, time_slot, count in double_bookings():
+            self.stdout.write(self.style.WARNING(f'doctor {doctor_id} is double booked at {time_slot} on {day} ({count} appointments)'))
@@ -0,0 +1,39 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from hospital.analysis import process_pending_analyses, requeue_stale_analyses
+
+
+class Command(BaseCommand):
+    help = 'Process queued lab report analyses with a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes parsing reports')
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help='Jobs claimed from the queue per round')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue running jobs older than this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is empty')
+
+    def handle(self, *args, **options):
+        processed = 0
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=django.setup) as executor:
+            while True:
+                requeue_stale_analyses(options['stale_after'])
+                handled = process_pending_analyses(executor, options['batch_size'])
+                processed += handled
+                if handled:
+                    self.stdout.write(f'Analyzed {handled} report(s), {processed} in total')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f'Analysis queue drained, {processed} report(s) processed'))
@@ -0,0 +1,240 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as day_time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from hospital import occupancy
+from hospital.counters import reconcile
+from hospital.dashboard_cache import dashboard_cache
+from hospital.models import (
+    Appointment, Medicine, Patient, Prescription, TestRequest, TestResult, TestType, User
+)
+
+TEST_TYPES = [
+    ('Blood Test', 50), ('Urine Test', 30), ('X-Ray', 120), ('ECG', 80), ('Ultrasound', 150),
+    ('MRI Scan', 600), ('CT Scan', 400), ('Lipid Profile', 60), ('Thyroid Panel', 70), ('HbA1c', 40),
+]
+SPECIALTIES = ['General Medicine', 'Cardiology', 'Dermatology', 'Neurology', 'Orthopedics', 'Pediatrics', 'ENT']
+FIRST_NAMES = ['Ava', 'Liam', 'Noah', 'Emma', 'Mia', 'Ethan', 'Zoe', 'Arjun', 'Priya', 'Omar', 'Sara', 'Ken', 'Lucia', 'Ivan']
+LAST_NAMES = ['Smith', 'Patel', 'Garcia', 'Chen', 'Okafor', 'Novak', 'Rossi', 'Kim', 'Silva', 'Nair', 'Brown', 'Haddad']
+PROBLEMS = ['Fever and cough', 'Chest pain', 'Back pain', 'Skin rash', 'Headache', 'Routine check-up', 'Fatigue', 'Joint pain']
+MEDICINES = [('Paracetamol', '500 mg'), ('Ibuprofen', '400 mg'), ('Amoxicillin', '250 mg'), ('Cetirizine', '10 mg'),
+             ('Omeprazole', '20 mg'), ('Metformin', '500 mg')]
+
+
+@contextmanager
+def keeping_timestamps(model, field_name):
+    """
+    Let bulk_create() store the given value of an auto_now_add field instead of
+    the current time, so seeded rows are dated like the visits they belong to.
+    """
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic doctors, patients, appointments, test requests, results and '
+            'prescriptions for capacity planning, using bulk inserts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=100)
+        parser.add_argument('--patients', type=int, default=10000)
+        parser.add_argument('--appointments', type=int, default=100000)
+        parser.add_argument('--receptionists', type=int, default=5)
+        parser.add_argument('--testers', type=int, default=10)
+        parser.add_argument('--days', type=int, default=730,
+                            help='Spread appointments over this many past days (and the next 30)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data')
+        parser.add_argument('--prefix', default='seed',
+                            help='Username prefix; run again with another prefix to add more data')
+        parser.add_argument('--password', default='Seed@2025', help='Password of every seeded user')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users named "{prefix}-..." exist already; pass another --prefix')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Hashing once keeps seeding fast while every user can still log in
+        self.password = make_password(options['password'])
+        self.today = date.today()
+        # (doctor, date, time slot) of every seeded appointment that holds its slot, so none is double booked
+        self.booked = set()
+        started = time.perf_counter()
+
+        self.doctor_ids = self.create_doctors(prefix, options['doctors'])
+        self.receptionist_ids = self.create_users(prefix, 'receptionist', options['receptionists'], is_receptionist=True)
+        self.tester_ids = self.create_users(prefix, 'tester', options['testers'], is_tester=True)
+        self.patient_ids = self.create_patients(prefix, options['patients'])
+        self.test_types = list(TestType.objects.all()) or TestType.objects.bulk_create(
+            TestType(name=name, price=price) for name, price in TEST_TYPES
+        )
+        if not self.doctor_ids or not self.patient_ids:
+            raise CommandError('At least one doctor and one patient are needed for appointments')
+
+        totals = {'appointments': 0, 'test requests': 0, 'results': 0, 'prescriptions': 0, 'medicines': 0}
+        with keeping_timestamps(Appointment, 'created_at'), keeping_timestamps(TestRequest, 'requested_at'), \
+                keeping_timestamps(Prescription, 'prescribed_at'):
+            for start in range(0, options['appointments'], self.batch_size):
+                with transaction.atomic():
+                    done = self.create_visits(min(self.batch_size, options['appointments'] - start), options['days'])
+                for name, count in done.items():
+                    totals[name] += count
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{totals['appointments']}/{options['appointments']} appointments")
+
+        # Bulk inserts bypass the signals that keep the counters, slot occupancy and dashboard cache current
+        reconcile()
+        occupancy.reconcile()
+        dashboard_cache().clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(self.doctor_ids)} doctors, {len(self.patient_ids)} patients, "
+            + ', '.join(f'{count} {name}' for name, count in totals.items())
+            + f' in {time.perf_counter() - started:.0f} s (password: {options["password"]})'
+        ))
+
+    def user(self, username, **flags):
+        return User(
+            username=username, password=self.password, first_name=self.rng.choice(FIRST_NAMES),
+            last_name=self.rng.choice(LAST_NAMES), phone_number=f'555{self.rng.randrange(10 ** 7):07d}', **flags
+        )
+
+    def create_users(self, prefix, role, count, **flags):
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = User.objects.bulk_create(
+                self.user(f'{prefix}-{role}-{i}', **flags)
+                for i in range(start, min(start + self.batch_size, count))
+            )
+            ids += [user.pk for user in users]
+        return ids
+
+    def create_doctors(self, prefix, count):
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = User.objects.bulk_create(
+                self.user(f'{prefix}-doctor-{i}', is_doctor=True, specialty=SPECIALTIES[i % len(SPECIALTIES)])
+                for i in range(start, min(start + self.batch_size, count))
+            )
+            ids += [user.pk for user in users]
+        return ids
+
+    def create_patients(self, prefix, count):
+        ids = []
+        for start in range(0, count, self.batch_size):
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    self.user(f'{prefix}-patient-{i}', is_patient=True)
+                    for i in range(start, min(start + self.batch_size, count))
+                )
+                Patient.objects.bulk_create(
+                    Patient(
+                        user=user, date_of_birth=self.today - timedelta(days=self.rng.randint(365, 90 * 365)),
+                        gender=self.rng.choice('MFO'), address=f'{self.rng.randint(1, 999)} Main Street',
+                        blood_group=self.rng.choice(['A+', 'A-', 'B+', 'B-', 'AB+', 'O+', 'O-']),
+                    )
+                    for user in users
+                )
+            ids += [user.pk for user in users]
+        return ids
+
+    def visit_status(self, day):
+        """(appointment status, whether a doctor is assigned) for a visit on `day`"""
+        roll = self.rng.random()
+        if day < self.today:
+            return ('COM', True) if roll < 0.85 else ('CAN', roll < 0.95)
+        if day == self.today:
+            return ('SCH', True) if roll < 0.7 else ('COM', True) if roll < 0.9 else ('PEN', False)
+        return ('SCH', True) if roll < 0.9 else ('PEN', False) if roll < 0.96 else ('CAN', True)
+
+    def create_visits(self, count, days):
+        slots = [slot for slot, _ in Appointment.TIME_SLOTS]
+        appointments = []
+        for _ in range(count):
+            day = self.today + timedelta(days=self.rng.randint(-days, 30))
+            status, assigned = self.visit_status(day)
+            time_slot = self.rng.choice(slots)
+            doctor_id = self.free_doctor(day, time_slot, status) if assigned else None
+            if assigned and doctor_id is None:
+                # Every doctor tried is booked: the visit is still waiting, or was cancelled unassigned
+                status = 'PEN' if day >= self.today else 'CAN'
+            appointments.append(Appointment(
+                patient_id=self.rng.choice(self.patient_ids), doctor_id=doctor_id,
+                date=day, time_slot=time_slot, problem=self.rng.choice(PROBLEMS), status=status,
+                created_at=self.moment(day - timedelta(days=self.rng.randint(0, 20))),
+            ))
+        appointments = Appointment.objects.bulk_create(appointments)
+
+        requests = []
+        for appointment in appointments:
+            for status in self.test_statuses(appointment):
+                requests.append(TestRequest(
+                    appointment=appointment, test_type=self.rng.choice(self.test_types),
+                    requested_by_id=appointment.doctor_id, status=status, requested_at=self.moment(appointment.date),
+                    approved_by_id=self.rng.choice(self.receptionist_ids) if status != 'PEN' and self.receptionist_ids else None,
+                    approved_at=self.moment(appointment.date) if status != 'PEN' else None,
+                    completed_by_id=self.rng.choice(self.tester_ids) if status == 'COM' and self.tester_ids else None,
+                ))
+        requests = TestRequest.objects.bulk_create(requests)
+        results = TestResult.objects.bulk_create(
+            TestResult(
+                test_request=request, result=self.rng.choice(['Within normal limits', 'Mildly elevated', 'Low', 'See notes']),
+                completed_by_id=request.completed_by_id,
+                completed_at=request.approved_at + timedelta(hours=self.rng.randint(1, 72)),
+            )
+            for request in requests if request.status == 'COM'
+        )
+
+        prescriptions = Prescription.objects.bulk_create(
+            Prescription(appointment=appointment, prescribed_by_id=appointment.doctor_id,
+                         prescribed_at=self.moment(appointment.date), notes='Rest and fluids')
+            for appointment in appointments if appointment.status == 'COM' and self.rng.random() < 0.6
+        )
+        medicines = Medicine.objects.bulk_create(
+            Medicine(prescription=prescription, name=name, dosage=dosage,
+                     duration=f'{self.rng.choice([3, 5, 7, 14, 30])} days', instructions='After meals')
+            for prescription in prescriptions
+            for name, dosage in self.rng.sample(MEDICINES, self.rng.randint(1, 3))
+        )
+        return {
+            'appointments': len(appointments), 'test requests': len(requests), 'results': len(results),
+            'prescriptions': len(prescriptions), 'medicines': len(medicines),
+        }
+
+    def free_doctor(self, day, time_slot, status, attempts=10):
+        """A random doctor without a visit in the slot, or None when `attempts` picks are all booked"""
+        for _ in range(attempts):
+            doctor_id = self.rng.choice(self.doctor_ids)
+            if (doctor_id, day, time_slot) not in self.booked:
+                if status != 'CAN':
+                    self.booked.add((doctor_id, day, time_slot))
+                return doctor_id
+        return None
+
+    def test_statuses(self, appointment):
+        """Statuses of the test requests to create for `appointment`, usually none"""
+        if appointment.status == 'COM' and self.rng.random() < 0.4:
+            # Tests of the last week's visits make up the open queues
+            recent = (self.today - appointment.date).days < 7
+            return [
+                self.rng.choice(['PEN', 'APP', 'COL', 'PRO']) if recent and self.rng.random() < 0.5
+                else 'COM' if self.rng.random() < 0.9 else self.rng.choice(['REJ', 'CAN'])
+                for _ in range(self.rng.randint(1, 2))
+            ]
+        if appointment.status == 'SCH' and appointment.date == self.today and self.rng.random() < 0.3:
+            return [self.rng.choice(['PEN', 'APP', 'COL', 'PRO'])]
+        return []
+
+    def moment(self, day):
+        """A time during working hours on `day`"""
+        return timezone.make_aware(datetime.combine(day, day_time(self.rng.randint(9, 16), self.rng.randint(0, 59))))
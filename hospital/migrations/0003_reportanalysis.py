@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0002_alter_appointment_doctor_alter_appointment_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('rules_version', models.CharField(max_length=64)),
+                ('abnormal_results', models.JSONField(default=list)),
+                ('analyzed_at', models.DateTimeField(auto_now=True)),
+                ('test_result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analysis', to='hospital.testresult')),
+            ],
+        ),
+    ]
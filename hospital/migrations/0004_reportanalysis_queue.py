@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0003_reportanalysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportanalysis',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='reportanalysis',
+            name='queued_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='reportanalysis',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportanalysis',
+            name='status',
+            field=models.CharField(choices=[('PEN', 'Pending'), ('RUN', 'Running'), ('RDY', 'Ready'), ('FAI', 'Failed')], default='PEN', max_length=3),
+        ),
+        migrations.AlterField(
+            model_name='reportanalysis',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='reportanalysis',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='reportanalysis',
+            name='rules_version',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='reportanalysis',
+            index=models.Index(fields=['status', 'queued_at'], name='hospital_re_status_d6aa97_idx'),
+        ),
+    ]
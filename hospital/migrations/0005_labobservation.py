@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0004_reportanalysis_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('test_name', models.CharField(max_length=255)),
+                ('test_key', models.CharField(help_text='Normalized test name used for lookups', max_length=255)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(blank=True, max_length=50)),
+                ('low', models.FloatField(blank=True, null=True)),
+                ('high', models.FloatField(blank=True, null=True)),
+                ('flag', models.CharField(blank=True, choices=[('', 'Normal'), ('L', 'Low'), ('H', 'High'), ('B', 'Borderline')], max_length=1)),
+                ('observed_on', models.DateField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_observations', to='hospital.patient')),
+                ('test_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observations', to='hospital.testresult')),
+            ],
+            options={
+                'ordering': ['-observed_on'],
+                'indexes': [models.Index(fields=['patient', 'test_key', 'observed_on'], name='hospital_la_patient_ef34af_idx')],
+            },
+        ),
+    ]
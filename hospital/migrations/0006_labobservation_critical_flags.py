@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0005_labobservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='labobservation',
+            name='flag',
+            field=models.CharField(blank=True, choices=[('', 'Normal'), ('L', 'Low'), ('H', 'High'), ('B', 'Borderline'), ('LL', 'Critical Low'), ('HH', 'Critical High')], max_length=2),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0006_labobservation_critical_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportanalysis',
+            name='pages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
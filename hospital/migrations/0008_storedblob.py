@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+import hospital.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0007_reportanalysis_pages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='testresult',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=hospital.storage.report_storage, upload_to='test_results/%Y/%m/%d/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0009_reportupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='compression',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('gz', 'gzip'), ('zst', 'Zstandard')], max_length=3),
+        ),
+        migrations.AddField(
+            model_name='storedblob',
+            name='stored_size',
+            field=models.BigIntegerField(blank=True, help_text='Bytes on disk once compressed', null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0010_storedblob_compression'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'date', 'status'], name='hospital_ap_doctor__b99741_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'status'], name='hospital_ap_date_00beb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date'], name='hospital_ap_patient_8d7a08_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('doctor__isnull', True)), fields=['status', 'date'], name='appointment_unassigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testrequest',
+            index=models.Index(fields=['status', 'requested_at'], name='hospital_te_status_91b419_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testrequest',
+            index=models.Index(fields=['status', 'approved_at'], name='hospital_te_status_c3df20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['completed_at'], name='hospital_te_complet_58c781_idx'),
+        ),
+    ]
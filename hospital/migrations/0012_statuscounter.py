@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:57
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def fill_counters(apps, schema_editor):
+    """Count the appointments and test requests that already exist, per status and per status and day"""
+    Appointment = apps.get_model('hospital', 'Appointment')
+    StatusCounter = apps.get_model('hospital', 'StatusCounter')
+    TestRequest = apps.get_model('hospital', 'TestRequest')
+    counts = Counter()
+    for row in Appointment.objects.order_by().values('status', 'date').annotate(n=Count('pk')):
+        counts[f'appointment:{row["status"]}'] += row['n']
+        counts[f'appointment:{row["status"]}:{row["date"]}'] += row['n']
+    counts['appointment:PEN:unassigned'] = Appointment.objects.filter(status='PEN', doctor__isnull=True).count()
+    rows = TestRequest.objects.order_by().annotate(
+        day=TruncDate('requested_at', tzinfo=timezone.get_current_timezone())
+    ).values('status', 'day').annotate(n=Count('pk'))
+    for row in rows:
+        counts[f'testrequest:{row["status"]}'] += row['n']
+        counts[f'testrequest:{row["status"]}:{row["day"]}'] += row['n']
+    StatusCounter.objects.bulk_create(
+        (StatusCounter(key=key, count=count) for key, count in counts.items() if count),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0011_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_occupancy(apps, schema_editor):
+    """Mark the slots of the appointments that already have a doctor and are not cancelled"""
+    Appointment = apps.get_model('hospital', 'Appointment')
+    DoctorDayOccupancy = apps.get_model('hospital', 'DoctorDayOccupancy')
+    bits = {slot: 1 << i for i, (slot, _) in enumerate(Appointment._meta.get_field('time_slot').choices)}
+    masks = {}
+    rows = Appointment.objects.filter(doctor__isnull=False).exclude(status='CAN').values_list('doctor_id', 'date', 'time_slot')
+    for doctor_id, day, time_slot in rows.iterator():
+        masks[doctor_id, day] = masks.get((doctor_id, day), 0) | bits[time_slot]
+    DoctorDayOccupancy.objects.bulk_create(
+        (DoctorDayOccupancy(doctor_id=doctor_id, date=day, slots=slots) for (doctor_id, day), slots in masks.items()),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0012_statuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slots', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(limit_choices_to={'is_doctor': True}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'date'), name='occupancy_doctor_date_unique')],
+            },
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
 
+from .storage import report_storage
+
 class User(AbstractUser):
     is_doctor = models.BooleanField(default=False)
     is_receptionist = models.BooleanField(default=False)
@@ -61,13 +65,20 @@ class Appointment(models.Model):
     
     class Meta:
         ordering = ['-date', 'time_slot']
+        indexes = [
+            # A doctor's day and appointment list
+            models.Index(fields=['doctor', 'date', 'status']),
+            # The reception desk's day
+            models.Index(fields=['date', 'status']),
+            # A patient's upcoming and past appointments
+            models.Index(fields=['patient', 'date']),
+            # Requests waiting for a doctor to be assigned
+            models.Index(fields=['status', 'date'], condition=models.Q(doctor__isnull=True), name='appointment_unassigned_idx'),
+        ]
     
     def __str__(self):
         doctor_name = self.doctor.get_full_name() if self.doctor else "Unassigned"
         return f"{self.patient} with Dr. {doctor_name} on {self.date} at {self.get_time_slot_display()}"
-    
-    def has_test_reports(self):
-        return self.testrequest_set.filter(testresult__isnull=False).exists()
 
 class TestType(models.Model):
     name = models.CharField(max_length=100)
@@ -99,6 +110,10 @@ class TestRequest(models.Model):
     
     class Meta:
         ordering = ['-requested_at']
+        indexes = [
+            models.Index(fields=['status', 'requested_at']),
+            models.Index(fields=['status', 'approved_at']),
+        ]
     
     def __str__(self):
         return f"{self.test_type} for {self.appointment.patient}"
@@ -109,11 +124,16 @@ class TestRequest(models.Model):
 class TestResult(models.Model):
     test_request = models.OneToOneField(TestRequest, on_delete=models.CASCADE)
     result = models.TextField()
-    file = models.FileField(upload_to='test_results/%Y/%m/%d/', blank=True, null=True)
+    file = models.FileField(upload_to='test_results/%Y/%m/%d/', storage=report_storage, blank=True, null=True)
     completed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['completed_at']),
+        ]
+    
     def __str__(self):
         return f"Results for {self.test_request}"
 
@@ -137,4 +157,152 @@ class Medicine(models.Model):
     instructions = models.TextField(blank=True)
     
     def __str__(self):
-        return f"{self.name} - {self.dosage} for {self.duration}"
\ No newline at end of file
+        return f"{self.name} - {self.dosage} for {self.duration}"
+
+class ReportAnalysis(models.Model):
+    test_result = models.OneToOneField(TestResult, on_delete=models.CASCADE, related_name='analysis')
+    STATUS_CHOICES = [
+        ('PEN', 'Pending'),
+        ('RUN', 'Running'),
+        ('RDY', 'Ready'),
+        ('FAI', 'Failed'),
+    ]
+    status = models.CharField(max_length=3, choices=STATUS_CHOICES, default='PEN')
+    content_hash = models.CharField(max_length=64, blank=True)
+    rules_version = models.CharField(max_length=64, blank=True)
+    abnormal_results = models.JSONField(default=list)
+    pages = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    analyzed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'queued_at']),
+        ]
+    
+    def __str__(self):
+        return f"Analysis of {self.test_result} ({self.get_status_display()})"
+    
+    def is_current(self, content_hash, rules_version):
+        return self.content_hash == content_hash and self.rules_version == rules_version
+
+
+class LabObservation(models.Model):
+    test_result = models.ForeignKey(TestResult, on_delete=models.CASCADE, related_name='observations')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='lab_observations')
+    test_name = models.CharField(max_length=255)
+    test_key = models.CharField(max_length=255, help_text='Normalized test name used for lookups')
+    value = models.FloatField()
+    unit = models.CharField(max_length=50, blank=True)
+    low = models.FloatField(null=True, blank=True)
+    high = models.FloatField(null=True, blank=True)
+    FLAG_CHOICES = [
+        ('', 'Normal'),
+        ('L', 'Low'),
+        ('H', 'High'),
+        ('B', 'Borderline'),
+        ('LL', 'Critical Low'),
+        ('HH', 'Critical High'),
+    ]
+    flag = models.CharField(max_length=2, choices=FLAG_CHOICES, blank=True)
+    observed_on = models.DateField()
+    
+    class Meta:
+        ordering = ['-observed_on']
+        indexes = [
+            models.Index(fields=['patient', 'test_key', 'observed_on']),
+        ]
+    
+    def __str__(self):
+        return f"{self.test_name}: {self.value} {self.unit} ({self.get_flag_display()})"
+    
+    @staticmethod
+    def key_for(test_name):
+        return ' '.join(test_name.lower().split())[:255]
+    
+    @classmethod
+    def flag_for(cls, status):
+        """Map parser statuses ('L', 'Low', 'Critical High', None, ...) to FLAG_CHOICES"""
+        if not status:
+            return ''
+        codes = {label.lower(): code for code, label in cls.FLAG_CHOICES}
+        return codes.get(status.lower(), status[0].upper())
+    
+    @classmethod
+    def history(cls, patient, test_name):
+        """All values of one test for a patient, oldest first, e.g. history(patient, 'HbA1c')"""
+        return cls.objects.filter(patient=patient, test_key=cls.key_for(test_name)).order_by('observed_on', 'pk')
+
+
+class StoredBlob(models.Model):
+    """One distinct report file kept by ContentAddressedStorage, shared by every upload of the same bytes"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    COMPRESSION_CHOICES = [
+        ('', 'None'),
+        ('gz', 'gzip'),
+        ('zst', 'Zstandard'),
+    ]
+    compression = models.CharField(max_length=3, choices=COMPRESSION_CHOICES, blank=True)
+    stored_size = models.BigIntegerField(null=True, blank=True, help_text='Bytes on disk once compressed')
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} reference(s))"
+
+
+class ReportUpload(models.Model):
+    """A chunked report upload in progress; the TestResult is created when it is finalized"""
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    test_request = models.ForeignKey(TestRequest, on_delete=models.CASCADE, related_name='uploads')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+    
+    @property
+    def complete(self):
+        return self.received >= self.size
+
+
+class StatusCounter(models.Model):
+    """
+    A running count of appointments or test requests, kept up to date by the
+    signals in hospital/signals.py so dashboards read totals without counting rows.
+    Keys are built by hospital.counters, e.g. "appointment:SCH:2025-03-14".
+    """
+    key = models.CharField(max_length=100, unique=True)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.key} = {self.count}"
+
+
+class DoctorDayOccupancy(models.Model):
+    """
+    The time slots a doctor holds on a day, as a bitmask over Appointment.TIME_SLOTS
+    (bit i set = the i-th slot is taken). Kept in step with appointments by the
+    signals in hospital/signals.py through hospital.occupancy, whose conditional
+    updates are what stop two receptionists booking the same doctor twice.
+    """
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'is_doctor': True})
+    date = models.DateField()
+    slots = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date'], name='occupancy_doctor_date_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.doctor} on {self.date}: {self.slots:0{len(Appointment.TIME_SLOTS)}b}"
@@ -0,0 +1,107 @@
+"""
+Which time slots each doctor holds, per day, as a bitmask in DoctorDayOccupancy.
+
+An appointment holds its slot from the moment a doctor is assigned until it is
+cancelled. claim() takes a slot with a single conditional UPDATE that only
+matches while the slot's bit is clear, and the unique (doctor, date) constraint
+settles a race to create the day's row, so of two receptionists booking the same
+doctor and slot at once exactly one succeeds. The signals in hospital/signals.py
+claim and release slots as appointments are saved and deleted; reconcile()
+rebuilds the masks for anything that bypassed them (queryset.update(),
+bulk_create(), raw SQL).
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.db.models.lookups import Exact
+
+from .models import Appointment, DoctorDayOccupancy, User
+
+SLOT_BITS = {slot: 1 << i for i, (slot, _) in enumerate(Appointment.TIME_SLOTS)}
+
+class SlotTaken(Exception):
+    """The doctor already holds an appointment in that slot"""
+
+def holds_slot(appointment):
+    return appointment.doctor_id is not None and appointment.status != 'CAN'
+
+def taken(bit):
+    """Condition matching the occupancy rows with `bit` set"""
+    return Exact(F('slots').bitand(bit), bit)
+
+def claim(doctor_id, day, time_slot):
+    """Mark the slot taken for the doctor, or raise SlotTaken if it already is"""
+    bit = SLOT_BITS[time_slot]
+    free = DoctorDayOccupancy.objects.filter(doctor_id=doctor_id, date=day).exclude(taken(bit))
+    if free.update(slots=F('slots') + bit):
+        return
+    try:
+        with transaction.atomic():
+            DoctorDayOccupancy.objects.create(doctor_id=doctor_id, date=day, slots=bit)
+        return
+    except IntegrityError:
+        # The day's row exists: the slot is taken, or another request created the row first
+        if free.update(slots=F('slots') + bit):
+            return
+    raise SlotTaken(f'Doctor {doctor_id} is already booked at {time_slot} on {day}')
+
+def release(doctor_id, day, time_slot):
+    bit = SLOT_BITS[time_slot]
+    DoctorDayOccupancy.objects.filter(doctor_id=doctor_id, date=day).filter(taken(bit)).update(slots=F('slots') - bit)
+
+def sync(previous, appointment):
+    """Move the slot `appointment` holds from what `previous` (its stored version, or None) held"""
+    before = (previous.doctor_id, previous.date, previous.time_slot) if previous and holds_slot(previous) else None
+    after = (appointment.doctor_id, appointment.date, appointment.time_slot) if holds_slot(appointment) else None
+    if before == after:
+        return
+    # Claim first, so a taken slot stops the save with nothing changed
+    if after:
+        claim(*after)
+    if before:
+        release(*before)
+
+def free_doctors(day, time_slot):
+    """The doctors with `time_slot` free on `day`; the subquery reads one row per doctor off the (doctor, date) index"""
+    busy = DoctorDayOccupancy.objects.filter(doctor=OuterRef('pk'), date=day).filter(taken(SLOT_BITS[time_slot]))
+    return User.objects.filter(is_doctor=True).filter(~Exists(busy)).order_by('first_name', 'last_name', 'pk')
+
+def actual_masks():
+    """{(doctor_id, date): slots} rebuilt from the appointments"""
+    masks = defaultdict(int)
+    rows = Appointment.objects.filter(doctor__isnull=False).exclude(status='CAN').order_by().values_list(
+        'doctor_id', 'date', 'time_slot'
+    ).distinct()
+    for doctor_id, day, time_slot in rows.iterator():
+        masks[doctor_id, day] |= SLOT_BITS[time_slot]
+    return masks
+
+@transaction.atomic
+def reconcile():
+    """Rewrite the masks that drifted from the appointments; returns {(doctor_id, date): (stored, actual)} for each fix"""
+    actual = actual_masks()
+    stored = {(row.doctor_id, row.date): row for row in DoctorDayOccupancy.objects.select_for_update()}
+    fixes = {
+        key: (stored[key].slots if key in stored else 0, actual.get(key, 0))
+        for key in set(stored) | set(actual)
+        if (stored[key].slots if key in stored else 0) != actual.get(key, 0)
+    }
+    changed, created = [], []
+    for (doctor_id, day), (_, slots) in fixes.items():
+        if (doctor_id, day) in stored:
+            stored[doctor_id, day].slots = slots
+            changed.append(stored[doctor_id, day])
+        else:
+            created.append(DoctorDayOccupancy(doctor_id=doctor_id, date=day, slots=slots))
+    DoctorDayOccupancy.objects.bulk_update(changed, ['slots'], batch_size=500)
+    DoctorDayOccupancy.objects.bulk_create(created, batch_size=500)
+    return fixes
+
+def double_bookings():
+    """(doctor_id, date, time_slot, appointments) for every slot more than one live appointment holds"""
+    return list(
+        Appointment.objects.filter(doctor__isnull=False).exclude(status='CAN').order_by()
+        .values('doctor_id', 'date', 'time_slot').annotate(n=Count('pk')).filter(n__gt=1)
+        .values_list('doctor_id', 'date', 'time_slot', 'n')
+    )
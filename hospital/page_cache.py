@@ -0,0 +1,104 @@
+"""
+Compressed sidecar files holding the extracted text of every page of a report.
+
+Layout: one zlib stream per page, then a table of little-endian uint64 offsets
+(page count + 1 entries) and a fixed footer with the page count, a "complete"
+flag and the magic bytes. Readers map the file into memory and only decompress
+the pages they are asked for.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+MAGIC = b'HMSPTXT1'
+FOOTER = struct.Struct('<IB8s')
+OFFSET = struct.Struct('<Q')
+
+
+class PageTextWriter:
+    """Append pages one at a time; the sidecar only appears on disk once closed"""
+
+    def __init__(self, path, level=6):
+        self.path = path
+        self.level = level
+        self.offsets = [0]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One temporary file per writer, so threads filling the same sidecar do not clobber each other
+        self.tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = open(self.tmp_path, 'wb')
+
+    def add(self, text):
+        blob = zlib.compress(text.encode('utf-8'), self.level)
+        self.file.write(blob)
+        self.offsets.append(self.offsets[-1] + len(blob))
+
+    def close(self, complete):
+        """Write the index; `complete` records whether every page of the PDF was added"""
+        count = len(self.offsets) - 1
+        self.file.write(struct.pack(f'<{count + 1}Q', *self.offsets))
+        self.file.write(FOOTER.pack(count, int(complete), MAGIC))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class PageTextReader:
+    """Random access to the pages of a sidecar, memory-mapped where the platform allows"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.data = self.file.read()
+        try:
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_index(self):
+        size = len(self.data)
+        if size < FOOTER.size:
+            raise ValueError("Truncated page text sidecar")
+        count, complete, magic = FOOTER.unpack_from(self.data, size - FOOTER.size)
+        index_start = size - FOOTER.size - (count + 1) * OFFSET.size
+        if magic != MAGIC or index_start < 0:
+            raise ValueError("Not a page text sidecar")
+        self.offsets = struct.unpack_from(f'<{count + 1}Q', self.data, index_start)
+        if self.offsets[-1] != index_start:
+            raise ValueError("Corrupt page text sidecar index")
+        self.page_count = count
+        self.complete = bool(complete)
+
+    def __len__(self):
+        return self.page_count
+
+    def page(self, number):
+        """Text of the page at 0-based `number`"""
+        start, end = self.offsets[number], self.offsets[number + 1]
+        return zlib.decompress(self.data[start:end]).decode('utf-8')
+
+    def __iter__(self):
+        for number in range(self.page_count):
+            yield self.page(number)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_page_text(path):
+    """PageTextReader for `path`, or None when there is no usable sidecar there"""
+    try:
+        return PageTextReader(path)
+    except (OSError, ValueError, struct.error):
+        return None
@@ -0,0 +1,134 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+PAGE_SIZE = 20
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated list. Iterate it like the queryset it came from;
+    next_url and previous_url are query strings for the neighbouring pages (None at
+    either end).
+    """
+
+    def __init__(self, object_list, next_url=None, previous_url=None):
+        self.object_list = object_list
+        self.next_url = next_url
+        self.previous_url = previous_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_url is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_url is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeping microseconds, which it cuts to milliseconds, so a cursor compares equal to its row"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=CursorEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+def decode_cursor(token, fields):
+    """The sort key values in `token`, converted back by their model fields; None if it is not a valid cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+def beyond(keys, values, backwards=False):
+    """
+    Rows after the row with sort key `values` in the order of `keys` ((name,
+    descending) pairs), or before it when `backwards`: the usual expansion of a row
+    comparison, (a > x) OR (a = x AND b > y) OR ..., with a per-column direction.
+    """
+    condition = Q()
+    for i, (name, descending) in enumerate(keys):
+        lookup = 'lt' if descending != backwards else 'gt'
+        equal = {key: value for (key, _), value in zip(keys[:i], values[:i])}
+        condition |= Q(**equal, **{f'{name}__{lookup}': values[i]})
+    return condition
+
+def paginate_keyset(request, queryset, ordering, per_page=PAGE_SIZE, prefix=''):
+    """
+    A KeysetPage of `queryset` sorted by `ordering` (order_by() style names of fields
+    or annotations, which must not be NULL: a row with a NULL key cannot be paged
+    past, so sort nullable columns through a Coalesce() annotation). The primary key
+    is appended as a tie-breaker, so cursors stay valid while rows are added or
+    removed, and a page costs a single indexed query however far the user has
+    paged. `prefix` separates the cursor parameters of several lists on one page.
+    """
+    ordering = list(ordering)
+    if ordering[-1].lstrip('-') not in ('pk', 'id'):
+        ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+    keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    opts = queryset.model._meta
+    annotations = queryset.query.annotations
+    fields, attributes = [], []
+    for name, _ in keys:
+        if name in annotations:
+            fields.append(annotations[name].output_field)
+            attributes.append(name)
+            continue
+        field = opts.pk if name == 'pk' else opts.get_field(name)
+        if field.null:
+            raise ValueError(f'Cannot paginate by {name}: it can be NULL; order by a Coalesce() of it instead')
+        fields.append(field)
+        attributes.append(field.attname)
+
+    after = request.GET.get(f'{prefix}after')
+    before = request.GET.get(f'{prefix}before')
+    backwards = bool(before) and not after
+    cursor = decode_cursor(before if backwards else after, fields) if (after or before) else None
+    if cursor is None:
+        # No cursor, or one that cannot be read: start from the first page
+        backwards = False
+    else:
+        queryset = queryset.filter(beyond(keys, cursor, backwards))
+    if backwards:
+        ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def url(direction, row):
+        query = request.GET.copy()
+        query.pop(f'{prefix}after', None)
+        query.pop(f'{prefix}before', None)
+        query[f'{prefix}{direction}'] = encode_cursor([getattr(row, attribute) for attribute in attributes])
+        return f'?{query.urlencode()}'
+
+    has_next = more if not backwards else cursor is not None
+    has_previous = more if backwards else cursor is not None
+    return KeysetPage(
+        rows,
+        next_url=url('after', rows[-1]) if rows and has_next else None,
+        previous_url=url('before', rows[0]) if rows and has_previous else None,
+    )
@@ -0,0 +1,210 @@
+"""
+Per-view request instrumentation.
+
+RequestMetricsMiddleware records, for every request, the SQL query count and time,
+queries repeated with the same SQL (the signature of an N+1 loop), template render
+time and total latency. Samples go to a rolling window per view name, summarised
+as percentiles and a latency histogram for the staff endpoint. REQUEST_BUDGETS
+declares limits per view; with REQUEST_BUDGETS_STRICT a request over budget
+raises BudgetExceeded, which fails the test that made it.
+
+Template time is measured by TimedDjangoTemplates, a drop-in replacement for the
+DjangoTemplates backend in TEMPLATES.
+"""
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches the rest
+HISTOGRAM_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+# What a REQUEST_BUDGETS entry can limit; each is a field of the recorded samples
+BUDGET_NAMES = ('queries', 'duplicate_queries', 'sql_ms', 'template_ms', 'latency_ms')
+
+_current = ContextVar('request_metrics', default=None)
+
+class BudgetExceeded(AssertionError):
+    """A request went over a REQUEST_BUDGETS limit while REQUEST_BUDGETS_STRICT is on"""
+
+def query_signature(sql):
+    """SQL with whitespace and IN-list lengths normalised, so repeats of one query compare equal"""
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+
+class RequestRecord:
+    """What one request did; filled in by the query wrapper and the template backend"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.signatures = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.signatures[query_signature(sql)] += 1
+
+    def duplicates(self):
+        """{signature: count} of the queries run more than once"""
+        return {signature: count for signature, count in self.signatures.items() if count > 1}
+
+class ViewMetrics:
+    """The most recent samples of one view, with the duplicate signatures they contain"""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.duplicates = Counter()
+        self.over_budget = 0
+
+    def add(self, sample, duplicates):
+        if len(self.samples) == self.samples.maxlen:
+            self.duplicates.subtract(self.samples[0]['duplicates'])
+            self.duplicates = +self.duplicates  # drop the signatures that fell to zero
+        sample['duplicates'] = duplicates
+        self.samples.append(sample)
+        self.duplicates.update(duplicates)
+
+    def summary(self):
+        latencies = sorted(s['latency_ms'] for s in self.samples)
+        buckets = [0] * len(HISTOGRAM_BUCKETS)
+        for value in latencies:
+            buckets[bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+        labels = [f'<={bound:g}' for bound in HISTOGRAM_BUCKETS[:-1]] + [f'>{HISTOGRAM_BUCKETS[-2]:g}']
+        histogram = dict(zip(labels, buckets))
+        count = len(self.samples)
+        return {
+            'requests': count,
+            'over_budget': self.over_budget,
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            },
+            'queries': {
+                'mean': round(sum(s['queries'] for s in self.samples) / count, 1) if count else None,
+                'max': max((s['queries'] for s in self.samples), default=None),
+            },
+            'sql_ms_mean': round(sum(s['sql_ms'] for s in self.samples) / count, 2) if count else None,
+            'template_ms_mean': round(sum(s['template_ms'] for s in self.samples) / count, 2) if count else None,
+            'latency_histogram_ms': histogram,
+            'duplicate_queries': [
+                {'sql': signature, 'executions': executions}
+                for signature, executions in self.duplicates.most_common(5)
+            ],
+        }
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, sample, duplicates, over_budget):
+        with self.lock:
+            metrics = self.views.get(view_name)
+            if metrics is None:
+                metrics = self.views[view_name] = ViewMetrics(settings.REQUEST_METRICS_WINDOW)
+            metrics.add(sample, duplicates)
+            metrics.over_budget += bool(over_budget)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metrics.summary() for name, metrics in sorted(self.views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+# Samples of this process; every worker keeps its own
+registry = MetricsRegistry()
+
+def budget_violations(view_name, sample):
+    budget = settings.REQUEST_BUDGETS.get(view_name) or {}
+    return [
+        f'{name} {sample[name]:.4g} > {budget[name]:g}'
+        for name in BUDGET_NAMES
+        if name in budget and sample[name] > budget[name]
+    ]
+
+class RequestMetricsMiddleware:
+    """Put it first in MIDDLEWARE so the whole request, sessions and auth included, is measured"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        latency = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        duplicates = record.duplicates()
+        sample = {
+            'latency_ms': latency * 1000,
+            'queries': record.queries,
+            'sql_ms': record.sql_seconds * 1000,
+            'template_ms': record.template_seconds * 1000,
+            'duplicate_queries': sum(duplicates.values()) - len(duplicates),
+        }
+        violations = budget_violations(view_name, sample)
+        registry.record(view_name, sample, duplicates, violations)
+        if violations:
+            message = f'{view_name} went over its request budget: {", ".join(violations)}'
+            if duplicates:
+                worst = max(duplicates, key=duplicates.get)
+                message += f'; repeated {duplicates[worst]} times: {worst}'
+            if settings.REQUEST_BUDGETS_STRICT:
+                raise BudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        record = _current.get()
+        if record is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record.template_seconds += time.perf_counter() - start
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates whose templates add their render time to the current request's metrics"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
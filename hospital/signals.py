@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, occupancy
+from .dashboard_cache import ALL, invalidate
+from .models import Appointment, Patient, Prescription, TestRequest, TestResult
+
+# Fields of the row as it was before a save that the receivers below compare against
+TRACKED_FIELDS = {
+    Appointment: ['status', 'date', 'time_slot', 'doctor_id', 'patient_id'],
+    TestRequest: ['status', 'requested_at'],
+}
+
+@receiver(pre_save, sender=Appointment)
+@receiver(pre_save, sender=TestRequest)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of the row, so post_save can see what the save changed"""
+    instance._previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous = sender.objects.filter(pk=instance.pk).only(*TRACKED_FIELDS[sender]).first()
+
+# Report file references
+
+def release_report_file(field_file, name):
+    """Drop a TestResult's reference to a stored file once the write is committed, so a rollback keeps it"""
+    if not name:
+        return
+    storage = field_file.storage
+
+    def release():
+        # Files from before content-addressed storage have no reference count; other reports may share them
+        content_hash = getattr(storage, 'content_hash', None)
+        if (content_hash is None or content_hash(name) is None) and TestResult.objects.filter(file=name).exists():
+            return
+        storage.delete(name)
+
+    transaction.on_commit(release)
+
+@receiver(pre_save, sender=TestResult)
+def remember_report_file(sender, instance, raw=False, **kwargs):
+    """Note the stored file name, and whether this save stores a new file (taking a reference of its own)"""
+    instance._previous_file = None
+    instance._stores_file = bool(instance.file) and not instance.file._committed
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_file = sender.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+@receiver(post_save, sender=TestResult)
+def release_replaced_report_file(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_file', None)
+    if not raw and previous and (previous != instance.file.name or instance._stores_file):
+        release_report_file(instance.file, previous)
+
+@receiver(post_delete, sender=TestResult)
+def release_deleted_report_file(sender, instance, **kwargs):
+    release_report_file(instance.file, instance.file.name)
+
+# Doctor slot occupancy
+
+@receiver(pre_save, sender=Appointment)
+def claim_doctor_slot(sender, instance, raw=False, **kwargs):
+    """Take the slot before the row is written, so a doctor already booked then raises SlotTaken and nothing is saved"""
+    if not raw:
+        occupancy.sync(instance._previous, instance)
+
+@receiver(post_delete, sender=Appointment)
+def release_doctor_slot(sender, instance, **kwargs):
+    if occupancy.holds_slot(instance):
+        occupancy.release(instance.doctor_id, instance.date, instance.time_slot)
+
+# Summary counters
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=TestRequest)
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    changes = dict.fromkeys(counters.keys_for(previous) if previous else [], -1)
+    for key in counters.keys_for(instance):
+        changes[key] = changes.get(key, 0) + 1
+    counters.adjust(changes)
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=TestRequest)
+def update_counters_on_delete(sender, instance, **kwargs):
+    counters.adjust(dict.fromkeys(counters.keys_for(instance), -1))
+
+# Dashboard cache
+
+def invalidate_on_commit(dashboards):
+    """Drop the cached (role, scope) dashboards once the write is committed, so no request re-caches the old rows"""
+    dashboards = {(role, scope) for role, scope in dashboards if scope is not None}
+    transaction.on_commit(lambda: [invalidate(role, scope) for role, scope in dashboards])
+
+def appointment_dashboards(patient_id, doctor_id):
+    return [('patient', patient_id), ('doctor', doctor_id)]
+
+def dashboards_for(instance):
+    """The dashboards that show `instance`"""
+    if isinstance(instance, Patient):
+        return [('receptionist', ALL)]
+    if isinstance(instance, Appointment):
+        dashboards = appointment_dashboards(instance.patient_id, instance.doctor_id) + [('receptionist', ALL)]
+        previous = getattr(instance, '_previous', None)
+        if previous is not None:
+            dashboards += appointment_dashboards(previous.patient_id, previous.doctor_id)
+        return dashboards
+    if isinstance(instance, TestRequest):
+        appointment = Appointment.objects.filter(pk=instance.appointment_id).values_list('patient_id', 'doctor_id').first()
+        return appointment_dashboards(*appointment or (None, None)) + [('receptionist', ALL), ('tester', ALL)]
+    if isinstance(instance, TestResult):
+        appointment = TestRequest.objects.filter(pk=instance.test_request_id).values_list(
+            'appointment__patient_id', 'appointment__doctor_id'
+        ).first()
+        return appointment_dashboards(*appointment or (None, None))
+    # Prescription: only the doctor dashboard shows whether one was written
+    doctor_id = Appointment.objects.filter(pk=instance.appointment_id).values_list('doctor_id', flat=True).first()
+    return [('doctor', doctor_id), ('doctor', instance.prescribed_by_id)]
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=TestRequest)
+@receiver(post_save, sender=TestResult)
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=TestRequest)
+@receiver(post_delete, sender=TestResult)
+@receiver(post_delete, sender=Prescription)
+def invalidate_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_on_commit(dashboards_for(instance))
@@ -0,0 +1,260 @@
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:  # optional; archives fall back to gzip
+    zstandard = None
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+# Compressed copies of old blobs sit next to where the plain file was, with one of these suffixes
+CODEC_SUFFIXES = {'zst': '.zst', 'gz': '.gz'}
+
+def available_codec(preferred):
+    """`preferred` if it can be used here; zstd needs the optional zstandard package"""
+    if preferred == 'zst' and zstandard is None:
+        return 'gz'
+    return preferred
+
+def codec_for_path(path):
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if path.endswith(suffix):
+            return codec
+    return ''
+
+def compress_file(source_path, target_path, codec, chunk_size=1024 * 1024):
+    """Stream `source_path` into a compressed `target_path`"""
+    with open(source_path, 'rb') as source:
+        if codec == 'zst':
+            with open(target_path, 'wb') as target:
+                with zstandard.ZstdCompressor(level=10).stream_writer(target, closefd=False) as writer:
+                    shutil.copyfileobj(source, writer, chunk_size)
+        else:
+            with gzip.open(target_path, 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, chunk_size)
+
+def open_compressed(path):
+    """A file object that reads the decompressed content of a compressed copy"""
+    if codec_for_path(path) == 'zst':
+        if zstandard is None:
+            raise RuntimeError(f'{path} is zstd-compressed but the zstandard package is not installed')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return gzip.open(path, 'rb')
+
+@contextmanager
+def readable_path(path):
+    """
+    A plain file path for `path`, decompressing compressed copies into a temporary
+    file for tools such as pdfplumber that need to seek.
+    """
+    codec = codec_for_path(path)
+    if not codec:
+        yield path
+        return
+    plain_path = path[:-len(CODEC_SUFFIXES[codec])]
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(plain_path)[1]) as tmp:
+        with open_compressed(path) as source:
+            shutil.copyfileobj(source, tmp, 1024 * 1024)
+        tmp.flush()
+        yield tmp.name
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that keeps each distinct file once, named after the sha256 of its
+    bytes. Uploads are hashed while they are streamed to a temporary file; identical
+    content only adds a reference to the existing StoredBlob, and delete() removes
+    the file once its last reference is gone. Names that are not blobs (reports
+    uploaded before this storage existed) are read and deleted as plain files.
+    """
+    prefix = 'reports'
+    chunk_size = 1024 * 1024
+    blob_name_re = re.compile(r'^reports/[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9]{1,10})?$')
+
+    def blob_name(self, content_hash, original_name=''):
+        ext = os.path.splitext(original_name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,10}', ext):
+            ext = ''
+        return f'{self.prefix}/{content_hash[:2]}/{content_hash}{ext}'
+
+    def content_hash(self, name):
+        """The sha256 encoded in a blob name, or None for other files"""
+        match = self.blob_name_re.match(name or '')
+        return match.group(1) if match else None
+
+    def _save(self, name, content):
+        fd, tmp_path = tempfile.mkstemp(dir=self.staging_dir())
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            return self.store_file(tmp_path, digest.hexdigest(), size, name)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def staging_dir(self):
+        """Directory on the same filesystem as the blobs, so finished files are renamed, not copied"""
+        path = self.path(os.path.join(self.prefix, 'tmp'))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save_staged(self, staged_path, name, content_hash=None):
+        """
+        Adopt a file already written into staging_dir() (e.g. a chunked upload) and
+        return the blob name. The staged file is hard-linked into place rather than
+        moved, and left for the caller to remove; it is hashed in one streaming pass
+        unless `content_hash` is given.
+        """
+        if content_hash is None:
+            digest = hashlib.sha256()
+            with open(staged_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+        tmp_path = os.path.join(self.staging_dir(), f'{content_hash}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            try:
+                os.link(staged_path, tmp_path)
+            except OSError:
+                shutil.copyfile(staged_path, tmp_path)
+            return self.store_file(tmp_path, content_hash, os.path.getsize(staged_path), name)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store_file(self, tmp_path, content_hash, size, name):
+        """
+        Move a hashed temporary file into place, unless the blob exists already, and add
+        a reference. The blob's row stays locked until the reference is counted, so a
+        concurrent delete() of the last reference cannot remove the file in between.
+        """
+        from .models import StoredBlob
+
+        blob_name = self.blob_name(content_hash, name)
+        full_path = self.path(blob_name)
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(sha256=content_hash).first()
+            if blob is None or not self.exists(blob_name):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+                os.replace(tmp_path, full_path)
+            self.add_reference(content_hash, blob_name, size)
+        return blob_name
+
+    def stored_path(self, name):
+        """The file actually on disk for `name`: the plain file or its compressed copy"""
+        path = self.path(name)
+        if not self.content_hash(name) or os.path.exists(path):
+            return path
+        for suffix in CODEC_SUFFIXES.values():
+            if os.path.exists(path + suffix):
+                return path + suffix
+        return path
+
+    def _open(self, name, mode='rb'):
+        path = self.stored_path(name)
+        if codec_for_path(path):
+            return File(open_compressed(path), name=name)
+        try:
+            return super()._open(name, mode)
+        except FileNotFoundError:
+            # Compressed by compress_old_reports since stored_path() looked
+            return File(open_compressed(self.stored_path(name)), name=name)
+
+    def exists(self, name):
+        return os.path.lexists(self.stored_path(name))
+
+    def size(self, name):
+        path = self.stored_path(name)
+        if codec_for_path(path):
+            from .models import StoredBlob
+
+            return StoredBlob.objects.values_list('size', flat=True).get(sha256=self.content_hash(name))
+        return os.path.getsize(path)
+
+    def compress(self, blob, codec):
+        """
+        Replace a blob's plain file with a compressed copy. The copy is in place before
+        the plain file goes, so readers always find one of them. Returns the new size.
+        """
+        path = self.path(blob.name)
+        target = path + CODEC_SUFFIXES[codec]
+        tmp_path = f'{target}.tmp'
+        try:
+            compress_file(path, tmp_path, codec)
+            os.chmod(tmp_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        stored_size = os.path.getsize(target)
+        type(blob).objects.filter(pk=blob.pk).update(compression=codec, stored_size=stored_size)
+        os.remove(path)
+        return stored_size
+
+    def get_available_name(self, name, max_length=None):
+        # Blob names come from the content, so the upload name never has to be made unique
+        return name
+
+    def add_reference(self, content_hash, blob_name, size):
+        from .models import StoredBlob
+
+        if StoredBlob.objects.filter(sha256=content_hash).update(ref_count=F('ref_count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(sha256=content_hash, name=blob_name, size=size, ref_count=1)
+        except IntegrityError:
+            # Another upload of the same content created the row first
+            StoredBlob.objects.filter(sha256=content_hash).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        from .models import StoredBlob
+
+        content_hash = self.content_hash(name)
+        if content_hash is None:
+            return super().delete(name)
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(sha256=content_hash).first()
+            if blob and StoredBlob.objects.filter(pk=blob.pk, ref_count__gt=1).update(ref_count=F('ref_count') - 1):
+                return
+            if blob:
+                blob.delete()
+            self.remove_blob_files(name)
+
+    def delete_unreferenced(self, name):
+        """Remove a blob's files if no StoredBlob counts it, e.g. after the transaction that added its reference rolled back"""
+        from .models import StoredBlob
+
+        content_hash = self.content_hash(name)
+        if content_hash is None:
+            return
+        with transaction.atomic():
+            if not StoredBlob.objects.select_for_update().filter(sha256=content_hash).exists():
+                self.remove_blob_files(name)
+
+    def remove_blob_files(self, name):
+        super().delete(name)
+        for suffix in CODEC_SUFFIXES.values():
+            if os.path.exists(self.path(name) + suffix):
+                os.remove(self.path(name) + suffix)
+
+
+def report_storage():
+    """Storage for TestResult files, configured as the "reports" entry of STORAGES"""
+    return storages['reports']
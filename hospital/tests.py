@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Appointment, Medicine, Patient, Prescription, TestRequest, TestResult, TestType, User
+from .request_metrics import BudgetExceeded, registry
+
+
+class PatientHistoryQueryCountTests(TestCase):
+    """patient_history must not go back to one query per visit"""
+
+    # Session and user, patient, visit count, the visits, one prefetch query each for their
+    # reported tests, prescriptions and medicines, then the session save (3 queries)
+    QUERIES = 11
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tester = User.objects.create_user('tester', password='x', is_tester=True)
+        cls.test_type = TestType.objects.create(name='Blood Test', price=50)
+
+    def patient_with_visits(self, username, visits):
+        doctor = User.objects.create_user(f'{username}-doctor', password='x', is_doctor=True, specialty='General Medicine')
+        user = User.objects.create_user(username, password='x', is_patient=True)
+        patient = Patient.objects.create(user=user, date_of_birth=date(1990, 1, 1), gender='F', address='1 Main Street')
+        for day in range(visits):
+            appointment = Appointment.objects.create(
+                patient=patient, doctor=doctor, date=date.today() - timedelta(days=day + 1),
+                time_slot='09:00', problem='Check-up', status='COM'
+            )
+            test_request = TestRequest.objects.create(
+                appointment=appointment, test_type=self.test_type, requested_by=doctor, status='COM'
+            )
+            TestResult.objects.create(
+                test_request=test_request, result='Within normal limits', completed_by=self.tester,
+                completed_at=timezone.now()
+            )
+            prescription = Prescription.objects.create(appointment=appointment, prescribed_by=doctor)
+            Medicine.objects.create(prescription=prescription, name='Paracetamol', dosage='500 mg', duration='5 days')
+        self.client.force_login(user)
+
+    def test_queries_do_not_grow_with_visits(self):
+        for username, visits in (('few', 3), ('many', 30)):
+            with self.subTest(visits=visits):
+                self.patient_with_visits(username, visits)
+                with self.assertNumQueries(self.QUERIES):
+                    response = self.client.get(reverse('patient_history'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['appointment_data']), min(visits, 10))
+
+
+class RequestBudgetTests(TestCase):
+    """REQUEST_BUDGETS_STRICT turns a request over its view's budget into a failure"""
+
+    def setUp(self):
+        user = User.objects.create_user('patient', password='x', is_patient=True)
+        Patient.objects.create(user=user, date_of_birth=date(1990, 1, 1), gender='F', address='1 Main Street')
+        self.client.force_login(user)
+        # The registry is per process: start from the samples of this test only
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def get_with_query_budget(self, queries):
+        with override_settings(REQUEST_BUDGETS_STRICT=True, REQUEST_BUDGETS={'patient_history': {'queries': queries}}):
+            return self.client.get(reverse('patient_history'))
+
+    def queries_used(self):
+        """How many queries patient_history really runs, as the middleware counted them"""
+        self.client.get(reverse('patient_history'))
+        queries = registry.snapshot()['patient_history']['queries']['max']
+        registry.reset()
+        return queries
+
+    def test_over_budget_raises(self):
+        queries = self.queries_used()
+        with self.assertRaisesMessage(BudgetExceeded, f'queries {queries} > {queries - 1}'):
+            self.get_with_query_budget(queries - 1)
+        self.assertEqual(registry.snapshot()['patient_history']['over_budget'], 1)
+
+    def test_strict_for_the_whole_suite(self):
+        self.assertTrue(settings.REQUEST_BUDGETS_STRICT)
+
+    def test_within_budget_passes(self):
+        response = self.get_with_query_budget(self.queries_used())
+        self.assertEqual(response.status_code, 200)
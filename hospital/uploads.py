@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReportUpload, TestResult
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+# Bytes read from the request per write, so a chunk never has to fit in memory
+READ_SIZE = 64 * 1024
+
+# sha256 of the bytes received so far per upload, {upload_id: (bytes hashed, hash)}, kept as
+# chunks are written so finalizing does not read the file again. Per process: an upload
+# whose chunks went to another worker is caught up from the staged file when finalized.
+_running_hashes = OrderedDict()
+_running_hashes_lock = threading.Lock()
+RUNNING_HASHES_KEPT = 256
+
+class UploadError(Exception):
+    """A chunk or finalize request that does not fit the upload; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def report_file_storage():
+    return TestResult._meta.get_field('file').storage
+
+def staging_path(upload):
+    """Where the chunks of `upload` are assembled, next to the stored reports when the storage allows it"""
+    storage = report_file_storage()
+    if hasattr(storage, 'staging_dir'):
+        directory = storage.staging_dir()
+    else:
+        directory = os.path.join(settings.MEDIA_ROOT, 'uploads')
+        os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{upload.upload_id}.part')
+
+def parse_content_range(header, size):
+    """(start, end) of a "bytes start-end/total" header for an upload of `size` bytes"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('Content-Range must look like "bytes start-end/total"')
+    start, end, total = map(int, match.groups())
+    if total != size or start > end or end >= size:
+        raise UploadError(f'Content-Range {header} does not fit an upload of {size} bytes', status=416)
+    if end - start + 1 > settings.REPORT_UPLOAD_MAX_CHUNK:
+        raise UploadError(f'Chunks are limited to {settings.REPORT_UPLOAD_MAX_CHUNK} bytes', status=413)
+    return start, end
+
+def write_chunk(upload, stream, start, end):
+    """
+    Append bytes start..end from `stream` to the staged file. Chunks must arrive in
+    order; a client that lost track of its position asks for `received` and resumes
+    from there.
+    """
+    if start != upload.received:
+        raise UploadError(f'Expected a chunk starting at byte {upload.received}', status=409)
+    path = staging_path(upload)
+    hashed, digest = running_hash(upload)
+    # Hash a copy, so the kept hash only moves on once the offset does
+    digest = digest.copy() if hashed == start else None
+    remaining = end - start + 1
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(start)
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                raise UploadError('The chunk ended before its Content-Range did')
+            f.write(data)
+            if digest is not None:
+                digest.update(data)
+            remaining -= len(data)
+
+    # Only one of two concurrent requests for the same chunk may move the offset on
+    moved = ReportUpload.objects.filter(pk=upload.pk, received=start).update(received=end + 1, updated_at=timezone.now())
+    if not moved:
+        upload.refresh_from_db()
+        raise UploadError(f'Expected a chunk starting at byte {upload.received}', status=409)
+    upload.received = end + 1
+    if digest is not None:
+        keep_running_hash(upload, end + 1, digest)
+    return upload
+
+def running_hash(upload):
+    """(bytes hashed, sha256) kept for `upload` in this process; (0, empty hash) when there is none"""
+    with _running_hashes_lock:
+        return _running_hashes.get(upload.upload_id) or (0, hashlib.sha256())
+
+def keep_running_hash(upload, hashed, digest):
+    with _running_hashes_lock:
+        _running_hashes[upload.upload_id] = (hashed, digest)
+        _running_hashes.move_to_end(upload.upload_id)
+        while len(_running_hashes) > RUNNING_HASHES_KEPT:
+            _running_hashes.popitem(last=False)
+
+def forget_running_hash(upload):
+    with _running_hashes_lock:
+        _running_hashes.pop(upload.upload_id, None)
+
+def staged_content_hash(upload):
+    """sha256 of the complete staged file, reading only the bytes the running hash has not seen"""
+    hashed, digest = running_hash(upload)
+    if hashed < upload.size:
+        digest = digest.copy()
+        with open(staging_path(upload), 'rb') as f:
+            f.seek(hashed)
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def check_upload(upload, expected_sha256=''):
+    """
+    Return the sha256 of a complete upload. With `expected_sha256` it must match the
+    checksum the client computed, or the upload is dropped.
+    """
+    if not upload.complete:
+        raise UploadError(f'Only {upload.received} of {upload.size} bytes have been received', status=409)
+    with open(staging_path(upload), 'r+b') as f:
+        f.truncate(upload.size)
+    content_hash = staged_content_hash(upload)
+    if expected_sha256 and expected_sha256.lower() != content_hash:
+        discard_upload(upload)
+        raise UploadError('The uploaded file does not match its sha256 checksum; please upload it again', status=422)
+    return content_hash
+
+def finish_upload(upload, test_result, content_hash):
+    """
+    Put a checked upload into report storage and point `test_result.file` at it. Call
+    it in the transaction that saves `test_result`: the stored file's reference is
+    rolled back with it, and the staged file is kept until the transaction commits,
+    so a failed save can be finalized again. See abandon_upload_file() for the rollback.
+    """
+    path = staging_path(upload)
+    storage = report_file_storage()
+    name = test_result.file.field.generate_filename(test_result, upload.filename)
+    if hasattr(storage, 'save_staged'):
+        name = storage.save_staged(path, name, content_hash)
+    else:
+        with open(path, 'rb') as f:
+            name = storage.save(name, File(f, name=upload.filename))
+    transaction.on_commit(lambda: discard_upload_file(upload))
+    test_result.file.name = name
+    return test_result
+
+def abandon_upload_file(test_result):
+    """After the transaction saving `test_result` rolled back: remove its stored file if nothing else references it"""
+    name = test_result.file.name
+    # An uncommitted file was never stored; its name is only the one the client sent
+    if not name or not test_result.file._committed:
+        return
+    storage = report_file_storage()
+    if hasattr(storage, 'delete_unreferenced'):
+        storage.delete_unreferenced(name)
+    else:
+        storage.delete(name)
+    test_result.file.name = None
+
+def discard_upload_file(upload):
+    path = staging_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    forget_running_hash(upload)
+
+def discard_upload(upload):
+    discard_upload_file(upload)
+    upload.delete()
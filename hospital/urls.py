@@ -1,7 +1,5 @@
 from django.urls import path
 from hospital import views
-from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -26,6 +24,8 @@ urlpatterns = [
     path('doctor/appointment/<int:appointment_id>/test/', views.request_test, name='request_test'),
     path('doctor/appointment/<int:appointment_id>/prescription/', views.create_prescription, name='create_prescription'),
     path('doctor/appointment/<int:appointment_id>/analyze/', views.analyze_test_results, name='analyze_test_results'),
+    path('doctor/appointment/<int:appointment_id>/analyze/export/', views.export_abnormal_results, name='export_abnormal_results'),
+    path('report/<int:result_id>/', views.download_report, name='download_report'),
     
     path('reception/login/', views.receptionist_login, name='receptionist_login'),
     path('reception/dashboard/', views.receptionist_dashboard, name='receptionist_dashboard'),
@@ -35,6 +35,10 @@ urlpatterns = [
     path('tester/login/', views.tester_login, name='tester_login'),
     path('tester/dashboard/', views.tester_dashboard, name='tester_dashboard'),
     path('tester/test/<int:test_id>/upload/', views.upload_test_result, name='upload_test_result'),
-]
+    path('tester/test/<int:test_id>/upload/start/', views.start_report_upload, name='start_report_upload'),
+    path('tester/upload/<uuid:upload_id>/', views.report_upload_chunk, name='report_upload_chunk'),
+    path('tester/upload/<uuid:upload_id>/finalize/', views.finalize_report_upload, name='finalize_report_upload'),
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('staff/dashboard-cache/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
+    path('staff/request-metrics/', views.request_metrics, name='request_metrics'),
+]
@@ -2,146 +2,40 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import HttpResponse, HttpResponseForbidden
-from django.db.models import Q
+from django.http import (
+    HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed, StreamingHttpResponse, Http404, JsonResponse
+)
+from django.views.decorators.http import condition, require_POST
+from django.urls import reverse
+from django.utils.text import slugify
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator
 from datetime import date
 from django.utils import timezone
 from .models import (
     User, Patient, Appointment, TestType, 
-    TestRequest, TestResult, Prescription, Medicine
+    TestRequest, TestResult, Prescription, Medicine, ReportAnalysis, ReportUpload
 )
 from .forms import (
     PatientSignUpForm, DoctorSignUpForm, AppointmentForm,
     TestRequestForm, TestResultForm, PrescriptionForm, MedicineForm,
     PatientLoginForm, DoctorLoginForm, ReceptionistLoginForm, TesterLoginForm
 )
-import pdfplumber
-import pandas as pd
-import re
+import hashlib
 import os
-from django.conf import settings
-
-# Define column aliases for PDF parsing
-HEADER_ALIASES = {
-    "test": ["test", "investigation", "parameter", "name"],
-    "value": ["value", "result", "observed", "reading"],
-    "unit": ["unit", "units", "measurement", "measure"],
-    "reference": ["reference", "range", "normal", "reference range"]
-}
-
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF using pdfplumber"""
-    text = ""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-    except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
-    return text
-
-def match_header_line(line):
-    tokens = re.split(r'\s{2,}', line.strip())
-    found = {key: None for key in HEADER_ALIASES}
-
-    for idx, token in enumerate(tokens):
-        token_lower = token.lower().strip()
-        for key, aliases in HEADER_ALIASES.items():
-            if any(alias in token_lower for alias in aliases):
-                found[key] = idx
-
-    if all(v is not None for v in found.values()):
-        return found
-    return None
-
-def parse_table_lines(lines, header_map, start_index):
-    results = []
-    for line in lines[start_index + 1:]:
-        if re.search(r'(end of report|clinical notes|doctor|pathologist|sample collection)', line, re.IGNORECASE):
-            break
-        tokens = re.split(r'\s{2,}', line.strip())
-        if len(tokens) < max(header_map.values()) + 1:
-            continue
-        try:
-            test = tokens[header_map["test"]].strip()
-            value_str = tokens[header_map["value"]].strip()
-            ref_str = tokens[header_map["reference"]].strip()
-
-            value_match = re.match(r"(L|H)?\s*(\d+(?:\.\d+)?)(?:\s*(L|H))?", value_str)
-            if not value_match:
-                continue
-            flag = value_match.group(1) or value_match.group(3)
-            value = float(value_match.group(2))
-
-            ref_vals = re.findall(r"\d+(?:\.\d+)?", ref_str)
-            if len(ref_vals) >= 2:
-                low, high = float(ref_vals[0]), float(ref_vals[1])
-            elif "<" in ref_str and len(ref_vals) == 1:
-                low, high = 0, float(ref_vals[0])
-            else:
-                continue
-
-            if not flag:
-                if value < low:
-                    flag = "Low"
-                elif value > high:
-                    flag = "High"
-                else:
-                    continue  # Skip normal values
-
-            results.append({
-                "Test": test,
-                "Status": flag
-            })
-        except Exception:
-            continue
-    return results
-
-def fallback_regex_extraction(text):
-    lines = text.split("\n")
-    results = []
-    for line in lines:
-        match = re.match(
-            r'([A-Za-z ()/%-]{3,50})\s+(\d+(?:\.\d+)?)\s*(Low|High|Borderline)?\s+(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*([a-zA-Z/%]+)',
-            line, re.IGNORECASE
-        )
-        if match:
-            test = match.group(1).strip()
-            value = float(match.group(2))
-            flag = match.group(3)
-            low = float(match.group(4))
-            high = float(match.group(5))
-
-            if not flag:
-                if value < low:
-                    flag = "Low"
-                elif value > high:
-                    flag = "High"
-                else:
-                    continue
-
-            results.append({
-                "Test": test,
-                "Status": flag
-            })
-    return results
-
-def extract_abnormal_results(text):
-    lines = text.split("\n")
-    all_results = []
-
-    for idx, line in enumerate(lines):
-        header_map = match_header_line(line)
-        if header_map:
-            results = parse_table_lines(lines, header_map, idx)
-            all_results.extend(results)
-
-    if not all_results:
-        all_results = fallback_regex_extraction(text)
-
-    return all_results
+from . import counters
+from .analysis import get_report_analyses, enqueue_analysis, report_file_path, stored_content_hash
+from .dashboard_cache import ALL, cached_dashboard, metrics as dashboard_metrics, reset_metrics
+from .downloads import report_file_response
+from .pagination import paginate_keyset
+from .request_metrics import registry as metrics_registry
+from .exports import CONTENT_TYPES, iter_csv, iter_xlsx
+from .occupancy import SlotTaken, free_doctors
+from .uploads import UploadError, abandon_upload_file, check_upload, finish_upload, parse_content_range, write_chunk
 
 # Utility functions
 def is_patient(user):
@@ -156,6 +50,12 @@ def is_receptionist(user):
 def is_tester(user):
     return user.is_authenticated and user.is_tester
 
+def is_staff(user):
+    return user.is_authenticated and user.is_staff
+
+# Visits per page of a patient's history
+HISTORY_PAGE_SIZE = 10
+
 # Home and Authentication Views
 def home(request):
     return render(request, 'hospital/home.html')
@@ -216,20 +116,22 @@ def patient_login(request):
 @user_passes_test(is_patient)
 def patient_dashboard(request):
     patient = request.user.patient
-    today = date.today()
-    appointments = Appointment.objects.filter(
-        patient=patient,
-        date__gte=today
-    ).order_by('date', 'time_slot')[:5]
-    test_results = TestResult.objects.filter(
-        test_request__appointment__patient=patient,
-        test_request__status='COM'
-    ).order_by('-completed_at')[:5]
+    
+    def build():
+        today = date.today()
+        appointments = Appointment.objects.filter(
+            patient=patient,
+            date__gte=today
+        ).select_related('doctor').order_by('date', 'time_slot')[:5]
+        test_results = TestResult.objects.filter(
+            test_request__appointment__patient=patient,
+            test_request__status='COM'
+        ).select_related('test_request__test_type').order_by('-completed_at')[:5]
+        return {'appointments': list(appointments), 'test_results': list(test_results)}
     
     context = {
         'patient': patient,
-        'appointments': appointments,
-        'test_results': test_results,
+        **cached_dashboard('patient', patient.pk, request, build),
     }
     return render(request, 'hospital/patient_dashboard.html', context)
 
@@ -237,7 +139,11 @@ def patient_dashboard(request):
 @user_passes_test(is_patient)
 def patient_appointments(request):
     patient = request.user.patient
-    appointments = Appointment.objects.filter(patient=patient).order_by('-date', '-time_slot')
+    appointments = paginate_keyset(
+        request,
+        Appointment.objects.filter(patient=patient).select_related('doctor'),
+        ['-date', '-time_slot']
+    )
     
     context = {
         'patient': patient,
@@ -272,25 +178,31 @@ def new_appointment(request):
 @user_passes_test(is_patient)
 def patient_history(request):
     patient = request.user.patient
-    appointments = Appointment.objects.filter(patient=patient, status='COM')
+    # A fixed number of queries per page: the visits, then their tests, prescriptions
+    # and medicines in one prefetch query each
+    appointments = Appointment.objects.filter(patient=patient, status='COM').select_related('doctor').prefetch_related(
+        Prefetch(
+            'testrequest_set',
+            queryset=TestRequest.objects.filter(testresult__isnull=False)
+                .select_related('test_type', 'testresult').order_by('testresult__id'),
+            to_attr='reported_tests'
+        ),
+        Prefetch('prescription_set', queryset=Prescription.objects.prefetch_related('medicines')),
+    ).order_by('-date', 'time_slot', '-id')
+    page = Paginator(appointments, HISTORY_PAGE_SIZE).get_page(request.GET.get('page'))
     
     appointment_data = []
-    for appointment in appointments:
-        test_results = TestResult.objects.filter(
-            test_request__appointment=appointment
-        )
-        prescriptions = Prescription.objects.filter(
-            appointment=appointment
-        )
+    for appointment in page:
         appointment_data.append({
             'appointment': appointment,
-            'test_results': test_results,
-            'prescriptions': prescriptions,
+            'test_results': [test_request.testresult for test_request in appointment.reported_tests],
+            'prescriptions': appointment.prescription_set.all(),
         })
     
     context = {
         'patient': patient,
         'appointment_data': appointment_data,
+        'page': page,
     }
     return render(request, 'hospital/patient_history.html', context)
 
@@ -326,26 +238,29 @@ def doctor_login(request):
 @user_passes_test(is_doctor)
 def doctor_dashboard(request):
     doctor = request.user
-    today = date.today()
     
-    appointments = Appointment.objects.filter(
-        doctor=doctor,
-        date=today,
-        status='SCH'
-    ).prefetch_related('testrequest_set__testresult').order_by('time_slot')
-    
-    for appointment in appointments:
-        appointment.has_reports = appointment.has_test_reports()
-    
-    test_results = TestResult.objects.filter(
-        test_request__appointment__doctor=doctor,
-        test_request__status='COM'
-    ).order_by('-completed_at')[:5]
+    def build():
+        today = date.today()
+        # Everything the rows need comes with the appointments, so the page costs the
+        # same few queries however many patients are booked
+        appointments = Appointment.objects.filter(
+            doctor=doctor,
+            date=today,
+            status='SCH'
+        ).select_related('patient__user').annotate(
+            has_prescription=Exists(Prescription.objects.filter(appointment=OuterRef('pk'))),
+            has_tests=Exists(TestRequest.objects.filter(appointment=OuterRef('pk'))),
+        ).order_by('time_slot')
+        
+        test_results = TestResult.objects.filter(
+            test_request__appointment__doctor=doctor,
+            test_request__status='COM'
+        ).select_related('test_request__test_type', 'test_request__appointment__patient__user').order_by('-completed_at')[:5]
+        return {'appointments': list(appointments), 'test_results': list(test_results)}
     
     context = {
         'doctor': doctor,
-        'appointments': appointments,
-        'test_results': test_results,
+        **cached_dashboard('doctor', doctor.pk, request, build),
     }
     return render(request, 'hospital/doctor_dashboard.html', context)
 
@@ -353,7 +268,11 @@ def doctor_dashboard(request):
 @user_passes_test(is_doctor)
 def doctor_appointments(request):
     doctor = request.user
-    appointments = Appointment.objects.filter(doctor=doctor).order_by('-date', '-time_slot')
+    appointments = paginate_keyset(
+        request,
+        Appointment.objects.filter(doctor=doctor).select_related('patient__user'),
+        ['-date', '-time_slot']
+    )
     
     context = {
         'doctor': doctor,
@@ -461,24 +380,24 @@ def analyze_test_results(request, appointment_id):
         test_request__appointment=appointment
     ).select_related('test_request__test_type')
     
+    reports = []
     abnormal_results = []
-    excel_file_url = None
+    analyses = {}
     
-    if test_results and test_results[0].file:
-        try:
-            pdf_path = test_results[0].file.path
-            text = extract_text_from_pdf(pdf_path)
-            abnormal_results = extract_abnormal_results(text)
-            
-            if abnormal_results:
-                excel_filename = f"abnormal_results_{appointment.id}_{test_results[0].id}.xlsx"
-                excel_path = os.path.join(settings.MEDIA_ROOT, 'analysis', excel_filename)
-                os.makedirs(os.path.dirname(excel_path), exist_ok=True)
-                df = pd.DataFrame(abnormal_results)[["Test", "Status"]]
-                df.to_excel(excel_path, index=False)
-                excel_file_url = settings.MEDIA_URL + f'analysis/{excel_filename}'
-        except Exception as e:
-            messages.error(request, f'Failed to analyze PDF: {str(e)}')
+    try:
+        analyses = get_report_analyses([result for result in test_results if result.file])
+    except Exception as e:
+        messages.error(request, f'Failed to analyze PDF: {str(e)}')
+    
+    for result in test_results:
+        analysis = analyses.get(result.id)
+        if analysis and analysis.status == 'RDY':
+            test_type = result.test_request.test_type.name
+            abnormal_results.extend({**row, 'TestType': test_type} for row in analysis.abnormal_results)
+        reports.append({
+            'result': result,
+            'analysis': analysis,
+        })
     
     if request.method == 'POST':
         messages.success(request, 'Analysis saved successfully!')
@@ -488,11 +407,98 @@ def analyze_test_results(request, appointment_id):
         'doctor': doctor,
         'appointment': appointment,
         'test_results': test_results,
+        'reports': reports,
+        'analysis_pending': any(a.status in ('PEN', 'RUN') for a in analyses.values()),
+        'analysis_ready': bool(analyses) and all(a.status == 'RDY' for a in analyses.values()),
         'abnormal_results': abnormal_results,
-        'excel_file_url': excel_file_url,
     }
     return render(request, 'hospital/analyze_test_results.html', context)
 
+def export_result_id(request):
+    result_id = request.GET.get('result')
+    if result_id and not result_id.isdigit():
+        raise Http404('Unknown test result')
+    return result_id
+
+def analysis_export_etag(request, appointment_id):
+    analyses = ReportAnalysis.objects.filter(
+        test_result__test_request__appointment_id=appointment_id,
+        test_result__test_request__appointment__doctor=request.user,
+        status='RDY'
+    ).order_by('pk').values_list('pk', 'content_hash', 'rules_version', 'analyzed_at')
+    result_id = export_result_id(request)
+    if result_id:
+        analyses = analyses.filter(test_result_id=result_id)
+    key = repr((request.GET.get('format', 'xlsx'), result_id, list(analyses)))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+@login_required
+@user_passes_test(is_doctor)
+@condition(etag_func=analysis_export_etag)
+def export_abnormal_results(request, appointment_id):
+    doctor = request.user
+    appointment = get_object_or_404(Appointment, id=appointment_id, doctor=doctor)
+    export_format = request.GET.get('format', 'xlsx')
+    if export_format not in CONTENT_TYPES:
+        raise Http404('Unknown export format')
+    
+    analyses = ReportAnalysis.objects.filter(
+        test_result__test_request__appointment=appointment,
+        status='RDY'
+    ).select_related('test_result__test_request__test_type').order_by('test_result_id')
+    result_id = export_result_id(request)
+    if result_id:
+        analyses = analyses.filter(test_result_id=result_id)
+    
+    header = ['Test Type', 'Test', 'Status']
+    rows = (
+        (analysis.test_result.test_request.test_type.name, row['Test'], row['Status'])
+        for analysis in analyses.iterator()
+        for row in analysis.abnormal_results
+    )
+    if export_format == 'csv':
+        content = iter_csv(header, rows)
+    else:
+        content = iter_xlsx(header, rows, sheet_name='Abnormal Results')
+    
+    filename = f"abnormal_results_{appointment.id}{f'_{result_id}' if result_id else ''}.{export_format}"
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def can_view_report(user, test_result):
+    """Lab staff, the appointment's doctor and the patient may open a report"""
+    appointment = test_result.test_request.appointment
+    return (
+        user.is_superuser
+        or user.is_tester
+        or appointment.doctor_id == user.id
+        or appointment.patient.user_id == user.id
+    )
+
+@login_required
+def download_report(request, result_id):
+    test_result = get_object_or_404(
+        TestResult.objects.select_related('test_request__appointment__patient', 'test_request__test_type'),
+        id=result_id
+    )
+    if not can_view_report(request.user, test_result):
+        return HttpResponseForbidden('You do not have access to this report.')
+    if not test_result.file:
+        raise Http404('No report file attached')
+    
+    path = report_file_path(test_result.file)
+    if not os.path.exists(path):
+        raise Http404('Report file is missing')
+    content_hash = stored_content_hash(test_result.file)
+    if not content_hash:
+        stat = os.stat(path)
+        content_hash = f'{stat.st_size:x}-{int(stat.st_mtime):x}'
+    ext = os.path.splitext(test_result.file.name)[1].lower()
+    filename = f"{slugify(test_result.test_request.test_type.name) or 'report'}-{test_result.id}{ext}"
+    return report_file_response(request, path, filename, f'"{content_hash}"', size=test_result.file.size)
+
 # Receptionist Views
 def receptionist_login(request):
     if request.method == 'POST':
@@ -513,20 +519,38 @@ def receptionist_login(request):
 @user_passes_test(is_receptionist)
 def receptionist_dashboard(request):
     today = date.today()
-    new_patients = Patient.objects.order_by('-created_at')[:5]
-    pending_tests = TestRequest.objects.filter(status='PEN').order_by('-requested_at')
-    today_appointments = Appointment.objects.filter(date=today, status='SCH').order_by('time_slot')
-    pending_appointments = Appointment.objects.filter(
-        status='PEN', 
-        doctor__isnull=True
-    ).order_by('date')
     
-    context = {
-        'new_patients': new_patients,
-        'pending_tests': pending_tests,
-        'today_appointments': today_appointments,
-        'pending_appointments': pending_appointments,
-    }
+    def build():
+        new_patients = Patient.objects.select_related('user').order_by('-created_at')[:5]
+        pending_tests = paginate_keyset(
+            request,
+            TestRequest.objects.filter(status='PEN').select_related(
+                'test_type', 'requested_by', 'appointment__patient__user'
+            ),
+            ['-requested_at'],
+            prefix='tests_'
+        )
+        pending_appointments = paginate_keyset(
+            request,
+            Appointment.objects.filter(status='PEN', doctor__isnull=True).select_related('patient__user'),
+            ['date'],
+            prefix='appointments_'
+        )
+        counts = counters.read(
+            counters.test_request_key('PEN'),
+            counters.appointment_key('SCH', today),
+            counters.UNASSIGNED_KEY,
+        )
+        return {
+            'new_patients': list(new_patients),
+            'pending_tests': pending_tests,
+            'pending_appointments': pending_appointments,
+            'pending_test_count': counts[counters.test_request_key('PEN')],
+            'today_appointment_count': counts[counters.appointment_key('SCH', today)],
+            'unassigned_count': counts[counters.UNASSIGNED_KEY],
+        }
+    
+    context = cached_dashboard('receptionist', ALL, request, build)
     return render(request, 'hospital/receptionist_dashboard.html', context)
 
 @login_required
@@ -545,13 +569,19 @@ def assign_doctor(request, appointment_id):
             doctor = get_object_or_404(User, id=doctor_id, is_doctor=True)
             appointment.doctor = doctor
             appointment.status = 'SCH'
-            appointment.save()
+            try:
+                with transaction.atomic():
+                    appointment.save()
+            except SlotTaken:
+                # Another receptionist booked the doctor into this slot since the page was shown
+                messages.error(request, f'Dr. {doctor.get_full_name()} is no longer free at that time. Please pick another doctor.')
+                return redirect('assign_doctor', appointment_id=appointment.id)
             messages.success(request, f'Doctor {doctor.get_full_name()} assigned successfully!')
             return redirect('receptionist_dashboard')
         else:
             messages.error(request, 'Please select a doctor')
     
-    doctors = User.objects.filter(is_doctor=True)
+    doctors = free_doctors(appointment.date, appointment.time_slot)
     context = {
         'appointment': appointment,
         'doctors': doctors,
@@ -603,13 +633,38 @@ def tester_login(request):
 @login_required
 @user_passes_test(is_tester)
 def tester_dashboard(request):
-    approved_tests = TestRequest.objects.filter(status='APP').order_by('-approved_at')
+    def build():
+        approved_tests = paginate_keyset(
+            request,
+            TestRequest.objects.filter(status='APP').select_related(
+                'test_type', 'requested_by', 'appointment__patient__user'
+            ).annotate(
+                # approved_at can be NULL, which a keyset cursor cannot page past
+                approved_or_requested_at=Coalesce('approved_at', 'requested_at')
+            ),
+            ['-approved_or_requested_at']
+        )
+        return {'approved_tests': approved_tests}
     
-    context = {
-        'approved_tests': approved_tests,
-    }
+    context = cached_dashboard('tester', ALL, request, build)
     return render(request, 'hospital/tester_dashboard.html', context)
 
+@login_required
+@user_passes_test(is_staff)
+def dashboard_cache_stats(request):
+    """Dashboard cache hits and misses per role, as JSON; POST resets them"""
+    if request.method == 'POST':
+        reset_metrics()
+    return JsonResponse({'roles': dashboard_metrics()})
+
+@login_required
+@user_passes_test(is_staff)
+def request_metrics(request):
+    """Recent per-view query counts, SQL and template time and latency of this process, as JSON; POST resets them"""
+    if request.method == 'POST':
+        metrics_registry.reset()
+    return JsonResponse({'pid': os.getpid(), 'views': metrics_registry.snapshot()})
+
 @login_required
 @user_passes_test(is_tester)
 def upload_test_result(request, test_id):
@@ -618,20 +673,27 @@ def upload_test_result(request, test_id):
     if request.method == 'POST':
         form = TestResultForm(request.POST, request.FILES)
         if form.is_valid():
+            test_result = form.save(commit=False)
+            test_result.test_request = test_request
+            test_result.completed_by = request.user
+            test_result.completed_at = timezone.now()
             try:
-                test_result = form.save(commit=False)
-                test_result.test_request = test_request
-                test_result.completed_by = request.user
-                test_result.completed_at = timezone.now()
-                test_result.save()
-                
-                test_request.status = 'COM'
-                test_request.completed_by = request.user
-                test_request.save()
+                # The stored file's reference, the status change and the queued analysis
+                # commit together or not at all
+                with transaction.atomic():
+                    test_result.save()
+                    
+                    test_request.status = 'COM'
+                    test_request.completed_by = request.user
+                    test_request.save()
+                    
+                    if test_result.file:
+                        enqueue_analysis(test_result)
                 
                 messages.success(request, 'Test results uploaded successfully!')
                 return redirect('tester_dashboard')
             except Exception as e:
+                abandon_upload_file(test_result)
                 messages.error(request, f'Failed to upload test result: {str(e)}')
         else:
             messages.error(request, 'Invalid form data. Please check your inputs.')
@@ -641,5 +703,98 @@ def upload_test_result(request, test_id):
     context = {
         'test_request': test_request,
         'form': form,
+        'chunked_upload_url': reverse('start_report_upload', args=[test_request.id]),
+        'max_chunk_size': settings.REPORT_UPLOAD_MAX_CHUNK,
+    }
+    return render(request, 'hospital/upload_test_result.html', context)
+
+# Chunked report uploads: start, PUT chunks with Content-Range (GET shows how much
+# arrived, to resume after a dropped connection), then finalize with the result text
+def report_upload_status(upload):
+    return {
+        'upload_id': str(upload.upload_id),
+        'size': upload.size,
+        'received': upload.received,
+        'chunk_url': reverse('report_upload_chunk', args=[upload.upload_id]),
+        'finalize_url': reverse('finalize_report_upload', args=[upload.upload_id]),
+        'max_chunk_size': settings.REPORT_UPLOAD_MAX_CHUNK,
     }
-    return render(request, 'hospital/upload_test_result.html', context)
\ No newline at end of file
+
+@login_required
+@user_passes_test(is_tester)
+@require_POST
+def start_report_upload(request, test_id):
+    test_request = get_object_or_404(TestRequest, id=test_id, status='APP')
+    filename = os.path.basename(request.POST.get('filename', '').replace('\\', '/')).strip()
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        size = 0
+    if not filename or size <= 0:
+        return JsonResponse({'error': 'A file name and a positive size are required'}, status=400)
+    if size > settings.REPORT_UPLOAD_MAX_SIZE:
+        return JsonResponse({'error': f'Reports are limited to {settings.REPORT_UPLOAD_MAX_SIZE} bytes'}, status=413)
+    
+    upload = ReportUpload.objects.create(
+        test_request=test_request,
+        created_by=request.user,
+        filename=filename[:255],
+        size=size,
+    )
+    return JsonResponse(report_upload_status(upload), status=201)
+
+@login_required
+@user_passes_test(is_tester)
+def report_upload_chunk(request, upload_id):
+    upload = get_object_or_404(ReportUpload, upload_id=upload_id, created_by=request.user)
+    if request.method == 'GET':
+        return JsonResponse(report_upload_status(upload))
+    if request.method != 'PUT':
+        return HttpResponseNotAllowed(['GET', 'PUT'])
+    
+    try:
+        start, end = parse_content_range(request.headers.get('Content-Range'), upload.size)
+        if request.META.get('CONTENT_LENGTH') != str(end - start + 1):
+            raise UploadError('Content-Length must match the Content-Range')
+        write_chunk(upload, request, start, end)
+    except UploadError as e:
+        return JsonResponse({'error': str(e), **report_upload_status(upload)}, status=e.status)
+    return JsonResponse(report_upload_status(upload))
+
+@login_required
+@user_passes_test(is_tester)
+@require_POST
+def finalize_report_upload(request, upload_id):
+    upload = get_object_or_404(
+        ReportUpload.objects.select_related('test_request'),
+        upload_id=upload_id, created_by=request.user, test_request__status='APP'
+    )
+    form = TestResultForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid form data', 'errors': form.errors}, status=400)
+    
+    test_request = upload.test_request
+    test_result = form.save(commit=False)
+    test_result.test_request = test_request
+    test_result.completed_by = request.user
+    test_result.completed_at = timezone.now()
+    try:
+        content_hash = check_upload(upload, request.POST.get('sha256', ''))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    
+    try:
+        with transaction.atomic():
+            finish_upload(upload, test_result, content_hash)
+            test_result.save()
+            test_request.status = 'COM'
+            test_request.completed_by = request.user
+            test_request.save()
+            upload.delete()
+    except Exception:
+        abandon_upload_file(test_result)
+        raise
+    enqueue_analysis(test_result)
+    
+    messages.success(request, 'Test results uploaded successfully!')
+    return JsonResponse({'test_result': test_result.id, 'redirect_url': reverse('tester_dashboard')})
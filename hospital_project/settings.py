@@ -13,10 +13,14 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import environ
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Whether this process is running the test suite (`manage.py test`)
+TESTING = sys.argv[1:2] == ['test']
+
 # Initialize environment variables
 env = environ.Env(
     DEBUG=(bool, False)
@@ -47,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hospital.request_metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +65,8 @@ ROOT_URLCONF = 'hospital_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also reports render time to RequestMetricsMiddleware
+        'BACKEND': 'hospital.request_metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -117,6 +123,68 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Lab report analysis queue
+# Reports are parsed by `python manage.py run_analysis_worker`; set this to True to
+# parse them inline instead (e.g. for local development without a worker running)
+ANALYSIS_QUEUE_EAGER = env.bool('ANALYSIS_QUEUE_EAGER', default=False)
+
+# Per-report limits, so one huge upload cannot monopolise an analysis worker
+ANALYSIS_MAX_PAGES = env.int('ANALYSIS_MAX_PAGES', default=500)
+ANALYSIS_MAX_SECONDS = env.float('ANALYSIS_MAX_SECONDS', default=120)
+ANALYSIS_MAX_RSS_MB = env.int('ANALYSIS_MAX_RSS_MB', default=1024)
+
+# Report downloads are checked by Django and then, when set, sent by the front-end server:
+# 'x-accel-redirect' (nginx; REPORT_SENDFILE_PREFIX must be an `internal` location aliased
+# to MEDIA_ROOT) or 'x-sendfile' (Apache mod_xsendfile, lighttpd). Empty serves them from
+# Django, with Range and ETag support.
+REPORT_SENDFILE = env('REPORT_SENDFILE', default='')
+REPORT_SENDFILE_PREFIX = env('REPORT_SENDFILE_PREFIX', default='/protected-media/')
+
+# compress_old_reports: report files first stored this many days ago are kept compressed
+# ('zst' needs the zstandard package, otherwise gzip is used)
+REPORT_ARCHIVE_AFTER_DAYS = env.int('REPORT_ARCHIVE_AFTER_DAYS', default=30)
+REPORT_ARCHIVE_CODEC = env('REPORT_ARCHIVE_CODEC', default='zst')
+
+# Chunked report uploads (bytes): largest report accepted and largest single chunk
+REPORT_UPLOAD_MAX_SIZE = env.int('REPORT_UPLOAD_MAX_SIZE', default=1024 * 1024 * 1024)
+REPORT_UPLOAD_MAX_CHUNK = env.int('REPORT_UPLOAD_MAX_CHUNK', default=8 * 1024 * 1024)
+
+# Extra flag bands as fractions of the reference range width, e.g.
+# {'borderline': 0.05, 'critical': 0.5}; empty keeps plain Low/High flags
+ANALYSIS_FLAG_BANDS = {}
+
+# Caches. "dashboards" holds each role's dashboard data until a write touches it (see
+# hospital/dashboard_cache.py). Writes only invalidate the cache the writing process
+# can reach, so it needs a backend every worker shares: by default files under
+# BASE_DIR/cache, which every worker on this host sees. Across hosts use a shared
+# server (e.g. 'pymemcache://...'); 'locmemcache://dashboards' is only safe when a
+# single process serves the site, and 'dummycache://' turns the cache off. Test runs
+# default to off, as rolled-back test data reuses ids a cached dashboard may hold.
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+    'dashboards': env.cache_url(
+        'DASHBOARD_CACHE_URL',
+        default='dummycache://' if TESTING else f"filecache://{(BASE_DIR / 'cache' / 'dashboards').as_posix()}"
+    ),
+}
+# Seconds a dashboard is kept at most, bounding staleness from changes no signal sees
+DASHBOARD_CACHE_TIMEOUT = env.int('DASHBOARD_CACHE_TIMEOUT', default=300)
+
+# Request instrumentation (hospital/request_metrics.py): samples kept per view for
+# /staff/request-metrics/, and per-view limits on queries, duplicate_queries (extra
+# runs of identical SQL), sql_ms, template_ms and latency_ms. Requests over budget
+# are logged, or raise BudgetExceeded with REQUEST_BUDGETS_STRICT, which is on while
+# `manage.py test` runs so a view going over its budget fails the suite.
+REQUEST_METRICS_WINDOW = env.int('REQUEST_METRICS_WINDOW', default=500)
+REQUEST_BUDGETS = {
+    'patient_dashboard': {'queries': 15, 'duplicate_queries': 0},
+    'patient_history': {'queries': 15, 'duplicate_queries': 0},
+    'doctor_dashboard': {'queries': 15, 'duplicate_queries': 0},
+    'receptionist_dashboard': {'queries': 15, 'duplicate_queries': 0},
+    'tester_dashboard': {'queries': 15, 'duplicate_queries': 0},
+}
+REQUEST_BUDGETS_STRICT = env.bool('REQUEST_BUDGETS_STRICT', default=TESTING)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -150,6 +218,10 @@ STORAGES = {
             "base_url": MEDIA_URL,
         },
     },
+    # Lab report files: stored once per distinct content, under MEDIA_ROOT/reports/
+    "reports": {
+        "BACKEND": "hospital.storage.ContentAddressedStorage",
+    },
     "staticfiles": {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
     },